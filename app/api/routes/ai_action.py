@@ -2,34 +2,27 @@
 POST /ai/action endpoint — validated against UI button matrix.
 """
 from fastapi import APIRouter, HTTPException, status, Form, UploadFile, File, Request
+from fastapi.responses import ORJSONResponse
 from typing import Optional
-import uuid
-import threading
+from pydantic import TypeAdapter
 import logging
 
 from app.utils.debug_recorder import DebugRequestRecorder
 from app.models.responses import JobResponse
 from app.models.requests import AIActionRequest
-from app.core.ai_action_handler import AIActionHandler
+from app.core.ai_action_handler import AIActionHandler, _KNOWN_TABS, _ALLOWED_PAIRS
 from app.dependencies import validate_file
-from app.utils.job_manager import create_job, update_job_status  # <-- added
+from app.utils.job_spawn import spawn_job
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
-# Allowed actions per tab (Availability has no defaults)
-_ALLOWED_BY_TAB = {
-    "Contact": {"AI Suggestions", "Validate"},
-    "Soft Skills": {"AI Suggestions", "Validate", "Enhance"},
-    "Tech Skills": {"AI Suggestions", "Validate"},
-    "About": {"AI Suggestions", "Validate", "Enhance", "Shorten"},
-    "Experience": {"AI Suggestions", "Validate", "Enhance"},
-    "Projects": {"AI Suggestions", "Validate", "Enhance"},
-    "Education": {"AI Suggestions", "Validate"},
-    "Certifications": {"AI Suggestions", "Validate"},
-    "Availability": set(),
-}
+# Built once at import; validate_python reuses the compiled core validator
+_AI_ACTION_TA = TypeAdapter(AIActionRequest)
+_AI_HANDLER = AIActionHandler()  # stateless; shared across requests
+
+# (tab, action) matrix lives with the handler so route and job share one table
 
 @router.post(
     "/action",
@@ -58,73 +51,58 @@ async def ai_action(
     rec = DebugRequestRecorder().start(
         route="/ai/action",
         method=request.method,
-        headers={k: v for k, v in request.headers.items()},
-        query=dict(request.query_params),
+        headers=request.headers,  # recorder copies only when enabled
+        query=request.query_params,
     )
-    rec.save_request_json({
-        "user_id": user_id,
-        "openai_api_key": "***provided***",
-        "model": model,
-        "action_type": action_type,
-        "tab": tab,
-        "resume_json_len": len(resume_json) if isinstance(resume_json, str) else None,
-        "max_output_tokens": max_output_tokens,
-        "temperature_zero": temperature_zero,
-        "custom_prompt": bool(prompt),
-    })
-    try:
-        if file:
-            rec.save_uploads([("file", file)])
-    except Exception:
-        pass
+    if rec.enabled:  # skip building the logged payload when recording is off
+        rec.save_request_json({
+            "user_id": user_id,
+            "openai_api_key": "***provided***",
+            "model": model,
+            "action_type": action_type,
+            "tab": tab,
+            "resume_json_len": len(resume_json),
+            "max_output_tokens": max_output_tokens,
+            "temperature_zero": temperature_zero,
+            "custom_prompt": bool(prompt),
+        })
+        try:
+            if file:
+                rec.save_uploads([("file", file)])
+        except Exception:
+            pass
     # ----------------
 
     try:
         # Validate default (tab, action) if NO custom prompt
         if not prompt:
-            allowed = _ALLOWED_BY_TAB.get(tab, None)
-            if allowed is None:
+            if tab not in _KNOWN_TABS:
                 raise HTTPException(status_code=400, detail=f"Unknown tab: {tab}")
-            if action_type not in allowed:
+            if (tab, action_type) not in _ALLOWED_PAIRS:
                 raise HTTPException(status_code=400, detail=f"Unsupported action '{action_type}' for tab '{tab}'")
 
+        request_data = _AI_ACTION_TA.validate_python({
+            "user_id": user_id,
+            "openai_api_key": openai_api_key,
+            "model": model,
+            "action_type": action_type,
+            "tab": tab,
+            "resume_json": resume_json,
+            "prompt": prompt,
+            "max_output_tokens": max_output_tokens,
+            "temperature_zero": temperature_zero,
+        })
+
+        # Spool last: nothing that can still reject the request runs between
+        # spooling and spawn_job, which owns closing the spool from then on
         pdf_content = None
         filename = None
         if file:
             pdf_content = await validate_file(file)
             filename = file.filename
-
-        request_data = AIActionRequest(
-            user_id=user_id,
-            openai_api_key=openai_api_key,
-            model=model,
-            action_type=action_type,
-            tab=tab,
-            resume_json=resume_json,
-            prompt=prompt,
-            max_output_tokens=max_output_tokens,
-            temperature_zero=temperature_zero,
-        )
-
-        handler = AIActionHandler()
-        job_id = str(uuid.uuid4())
-
-        # Route owns job-creation lifecycle (matches extract.py; prevents initial GET 404)
-        create_job(job_id, user_id, openai_api_key)
-        update_job_status(job_id, "queued", 0)
-
-        # Schedule background execution
-        th = threading.Thread(
-            name=f"ai-action-{job_id[:8]}",
-            target=handler.process_action,
-            args=(job_id, request_data, pdf_content, filename),
-            daemon=True,
-        )
-        th.start()
-
+        job_id = spawn_job(request.app, _AI_HANDLER.process_action, request_data, pdf_content, filename)
         resp = JobResponse(job_id=job_id, status="queued", message="AI action job created")
-        payload = resp.model_dump() if hasattr(resp, "model_dump") else resp.dict()
-        rec.save_response(status.HTTP_202_ACCEPTED, payload)
+        rec.save_response(status.HTTP_202_ACCEPTED, resp)
         return resp
 
     except HTTPException as e:
@@ -137,3 +115,5 @@ async def ai_action(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create AI action job",
         )
+    finally:
+        rec.close()
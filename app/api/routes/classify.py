@@ -2,9 +2,9 @@
 POST /classify Endpoint
 """
 
-from fastapi import APIRouter, BackgroundTasks, HTTPException, status, Form, UploadFile, File, Request
+from fastapi import APIRouter, HTTPException, status, Form, UploadFile, File, Request
+from fastapi.responses import ORJSONResponse
 from typing import Optional
-import uuid
 import logging
 
 from app.dependencies import validate_file
@@ -12,15 +12,18 @@ from app.models.requests import ClassificationRequest
 from app.models.responses import JobResponse
 from app.core.classification_handler import ClassificationHandler
 from app.utils.debug_recorder import DebugRequestRecorder
+from app.utils.job_spawn import spawn_job
 
 logger = logging.getLogger(__name__)
 
 # No prefix here; mount in main as: app.include_router(classify_router, prefix="/classify")
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 _MIN_TOKENS = 64
 _MAX_TOKENS = 8192
 
+_CLASSIFY_HANDLER = ClassificationHandler()  # stateless; shared across requests
+
 
 @router.post(
     "",
@@ -40,7 +43,6 @@ _MAX_TOKENS = 8192
 )
 async def classify_document(
     request: Request,
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(
         ...,
         description="PDF file to classify. Must be a valid PDF and pass server-side validation.",
@@ -85,25 +87,23 @@ async def classify_document(
     rec = DebugRequestRecorder().start(
         route="/classify",
         method=request.method,
-        headers={k: v for k, v in request.headers.items()},
-        query=dict(request.query_params),
+        headers=request.headers,  # recorder copies only when enabled
+        query=request.query_params,
     )
-    rec.save_request_json({
-        "user_id": user_id,
-        "openai_api_key": "***provided***",
-        "model": model,
-        "max_output_tokens": max_output_tokens,
-        "temperature_zero": temperature_zero,
-    })
-    try:
-        rec.save_uploads([("file", file)])
-    except Exception:
-        pass
+    if rec.enabled:  # skip building the logged payload when recording is off
+        rec.save_request_json({
+            "user_id": user_id,
+            "openai_api_key": "***provided***",
+            "model": model,
+            "max_output_tokens": max_output_tokens,
+            "temperature_zero": temperature_zero,
+        })
+        try:
+            rec.save_uploads([("file", file)])
+        except Exception:
+            pass
     # --------------------------------------------
     try:
-        # Validate file and read content
-        content = await validate_file(file)
-
         # Light-range validation for tokens (keeps Swagger doc truthful)
         if max_output_tokens is not None:
             if not (_MIN_TOKENS <= max_output_tokens <= _MAX_TOKENS):
@@ -120,21 +120,12 @@ async def classify_document(
             temperature_zero=temperature_zero,
         )
 
-        handler = ClassificationHandler()
-        job_id = str(uuid.uuid4())
-
-        # Schedule background processing via FastAPI BackgroundTasks
-        background_tasks.add_task(
-            handler.process_classification,
-            job_id=job_id,
-            request_data=request_data,
-            file_content=content,
-            filename=file.filename,
-        )
-
+        # Spool last: nothing that can still reject the request runs between
+        # spooling and spawn_job, which owns closing the spool from then on
+        content = await validate_file(file)
+        job_id = spawn_job(request.app, _CLASSIFY_HANDLER.process_classification, request_data, content, file.filename)
         resp = JobResponse(job_id=job_id, status="queued", message="Classification job created")
-        payload = resp.model_dump() if hasattr(resp, "model_dump") else (resp.dict() if hasattr(resp, "dict") else resp)
-        rec.save_response(status.HTTP_202_ACCEPTED, payload)
+        rec.save_response(status.HTTP_202_ACCEPTED, resp)
         return resp
     except HTTPException as e:
         rec.save_response(getattr(e, "status_code", 500), {"detail": getattr(e, "detail", "HTTP error")})
@@ -146,3 +137,5 @@ async def classify_document(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create classification job",
         )
+    finally:
+        rec.close()
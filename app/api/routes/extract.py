@@ -10,10 +10,10 @@ Final paths:
 """
 
 from fastapi import APIRouter, HTTPException, status, Form, UploadFile, File, Request
-from typing import Optional, List, Any
-import json
-import uuid
-import threading
+from fastapi.responses import ORJSONResponse
+from typing import Annotated, Optional, List, Any
+from pydantic import Field, TypeAdapter, ValidationError
+import orjson
 import logging
 
 from app.utils.debug_recorder import DebugRequestRecorder
@@ -21,11 +21,26 @@ from app.dependencies import validate_file
 from app.models.requests import SingleExtractionRequest, BatchExtractionRequest, PromptItem
 from app.models.responses import JobResponse
 from app.core.extraction_handler import ExtractionHandler
-from app.utils.job_manager import create_job
+from app.utils.job_spawn import spawn_job
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Built once at import; validate_python reuses the compiled core validators
+_SINGLE_TA = TypeAdapter(SingleExtractionRequest)
+_BATCH_TA = TypeAdapter(BatchExtractionRequest)
+_PROMPTS_TA = TypeAdapter(Annotated[List[PromptItem], Field(min_length=1)])
+_EXTRACT_HANDLER = ExtractionHandler()  # stateless; shared across requests
+
+
+def _format_prompt_errors(e: ValidationError) -> str:
+    """Render validator errors as 'prompts[i].field: msg' (first few only)."""
+    parts = []
+    for err in e.errors(include_url=False)[:5]:
+        loc = "prompts" + "".join(f"[{p}]" if isinstance(p, int) else f".{p}" for p in err["loc"])
+        parts.append(f"{loc}: {err['msg']}")
+    return "; ".join(parts)
 
 
 @router.post(
@@ -106,62 +121,42 @@ async def extract_single(
     rec = DebugRequestRecorder().start(
         route="/extract/single",
         method=request.method,
-        headers={k: v for k, v in request.headers.items()},
-        query=dict(request.query_params),
+        headers=request.headers,  # recorder copies only when enabled
+        query=request.query_params,
     )
-        # try to parse prompt if it’s JSON-like
-    logged_prompt = None
-    if isinstance(prompt, str):
+    if rec.enabled:  # skip building the logged payload when recording is off
+        rec.save_request_json({
+            "user_id": user_id,
+            "openai_api_key": "***provided***",
+            "model": model,
+            "prompt_type": prompt_type,
+            "prompt": (prompt[:2000] if isinstance(prompt, str) else None),
+            "max_output_tokens": max_output_tokens,
+            "temperature_zero": temperature_zero,
+        })
         try:
-            parsed = json.loads(prompt)
-            logged_prompt = parsed
+            rec.save_uploads([("file", file)])
         except Exception:
-            logged_prompt = prompt[:2000]  # keep truncated raw string
-    else:
-        logged_prompt = prompt
-    rec.save_request_json({
-        "user_id": user_id,
-        "openai_api_key": "***provided***",
-        "model": model,
-        "prompt_type": prompt_type,
-        "prompt": (prompt[:2000] if isinstance(prompt, str) else None),
-        "max_output_tokens": max_output_tokens,
-        "temperature_zero": temperature_zero,
-    })
-    try:
-        rec.save_uploads([("file", file)])
-    except Exception:
-        pass
+            pass
     # ------------------------------------------
 
     try:
-        content = await validate_file(file)
-
-        request_data = SingleExtractionRequest(
-            user_id=user_id,
-            openai_api_key=openai_api_key,
-            model=model,
-            prompt_type=prompt_type,
-            prompt=prompt,
-            max_output_tokens=max_output_tokens,
-            temperature_zero=temperature_zero,
-        )
-
-        handler = ExtractionHandler()
-        job_id = str(uuid.uuid4())
-        create_job(job_id, request_data.user_id, request_data.openai_api_key)
-
-        th = threading.Thread(
-            name=f"extract-single-{job_id[:8]}",
-            target=handler.process_single_extraction,
-            args=(job_id, request_data, content, file.filename),
-            daemon=True,
-        )
-        th.start()
+        request_data = _SINGLE_TA.validate_python({
+            "user_id": user_id,
+            "openai_api_key": openai_api_key,
+            "model": model,
+            "prompt_type": prompt_type,
+            "prompt": prompt,
+            "max_output_tokens": max_output_tokens,
+            "temperature_zero": temperature_zero,
+        })
 
+        # Spool last: nothing that can still reject the request runs between
+        # spooling and spawn_job, which owns closing the spool from then on
+        content = await validate_file(file)
+        job_id = spawn_job(request.app, _EXTRACT_HANDLER.process_single_extraction, request_data, content, file.filename)
         resp = JobResponse(job_id=job_id, status="queued", message="Single extraction job created")
-        payload = resp.model_dump() if hasattr(resp, "model_dump") else (resp.dict() if hasattr(resp, "dict") else resp)
-        rec.save_response(status.HTTP_202_ACCEPTED, payload)
+        rec.save_response(status.HTTP_202_ACCEPTED, resp)
         return resp
 
     except HTTPException as e:
@@ -174,6 +169,8 @@ async def extract_single(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create extraction job",
         )
+    finally:
+        rec.close()
 
 
 @router.post(
@@ -253,91 +250,63 @@ async def extract_batch(
     rec = DebugRequestRecorder().start(
         route="/extract/batch",
         method=request.method,
-        headers={k: v for k, v in request.headers.items()},
-        query=dict(request.query_params),
+        headers=request.headers,  # recorder copies only when enabled
+        query=request.query_params,
     )
 
-    # try to parse prompts if it’s JSON-like
-    logged_prompts = None
-    if isinstance(prompts, str):
+    # Only the debug log needs a Python copy of prompts; when recording is off the
+    # validator below parses and validates the JSON text in a single pass.
+    parsed_prompts: Any = None
+    if rec.enabled:  # skip building the logged payload when recording is off
+        try:
+            parsed_prompts = orjson.loads(prompts)
+        except orjson.JSONDecodeError:
+            pass
+        rec.save_request_json({
+            "user_id": user_id,
+            "openai_api_key": "***provided***",
+            "model": model,
+            # on a parse error keep the truncated raw string instead
+            "prompts": parsed_prompts if parsed_prompts is not None else prompts[:2000],
+            "max_output_tokens": max_output_tokens,
+            "temperature_zero": temperature_zero,
+        })
         try:
-            parsed = json.loads(prompts)
-            logged_prompts = parsed
+            rec.save_uploads([("file", file)])
         except Exception:
-            logged_prompts = prompts[:2000]  # keep truncated raw string
-    else:
-        logged_prompts = prompts
-
-    rec.save_request_json({
-        "user_id": user_id,
-        "openai_api_key": "***provided***",
-        "model": model,
-        "prompts": logged_prompts,
-        "max_output_tokens": max_output_tokens,
-        "temperature_zero": temperature_zero,
-    })
-    try:
-        rec.save_uploads([("file", file)])
-    except Exception:
-        pass
+            pass
     # -----------------------------------------
     try:
-        content = await validate_file(file)
-
         try:
-            parsed: Any = json.loads(prompts)
-            if not isinstance(parsed, list):
-                raise ValueError("Expected a JSON array for 'prompts'")
-
-            prompt_items: List[PromptItem] = []
-            for i, item in enumerate(parsed):
-                if not isinstance(item, dict):
-                    raise ValueError(f"prompts[{i}] must be an object")
-                ptype = item.get("prompt_type")
-                if not isinstance(ptype, str) or not ptype.strip():
-                    raise ValueError(f"prompts[{i}].prompt_type is required and must be a non-empty string")
-                ptext = item.get("prompt")
-                if ptext is not None and not isinstance(ptext, str):
-                    raise ValueError(f"prompts[{i}].prompt must be a string when provided")
-                prompt_items.append(PromptItem(prompt_type=ptype, prompt=ptext))
-
-            if not prompt_items:
-                raise ValueError("prompts array must not be empty")
-
-        except (json.JSONDecodeError, ValueError) as e:
+            if parsed_prompts is not None:
+                prompt_items: List[PromptItem] = _PROMPTS_TA.validate_python(parsed_prompts)
+            else:
+                prompt_items = _PROMPTS_TA.validate_json(prompts)
+        except ValidationError as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid prompts format: {str(e)}",
+                detail=f"Invalid prompts format: {_format_prompt_errors(e)}",
             )
 
-        request_data = BatchExtractionRequest(
-            user_id=user_id,
-            openai_api_key=openai_api_key,
-            model=model,
-            prompts=prompt_items,
-            max_output_tokens=max_output_tokens,
-            temperature_zero=temperature_zero,
-        )
-
-        handler = ExtractionHandler()
-        job_id = str(uuid.uuid4())
-        create_job(job_id, request_data.user_id, request_data.openai_api_key)
-
-        th = threading.Thread(
-            name=f"extract-batch-{job_id[:8]}",
-            target=handler.process_batch_extraction,
-            args=(job_id, request_data, content, file.filename),
-            daemon=True,
-        )
-        th.start()
+        request_data = _BATCH_TA.validate_python({
+            "user_id": user_id,
+            "openai_api_key": openai_api_key,
+            "model": model,
+            "prompts": prompt_items,
+            "max_output_tokens": max_output_tokens,
+            "temperature_zero": temperature_zero,
+        })
 
+        # Spool last: nothing that can still reject the request runs between
+        # spooling and spawn_job, which owns closing the spool from then on
+        content = await validate_file(file)
+        job_id = spawn_job(request.app, _EXTRACT_HANDLER.process_batch_extraction, request_data, content, file.filename)
         resp = JobResponse(
             job_id=job_id,
             status="queued",
             message=f"Batch extraction job created with {len(prompt_items)} prompts",
         )
-        payload = resp.model_dump() if hasattr(resp, "model_dump") else (resp.dict() if hasattr(resp, "dict") else resp)
-        rec.save_response(status.HTTP_202_ACCEPTED, payload)
+        rec.save_response(status.HTTP_202_ACCEPTED, resp)
         return resp
 
     except HTTPException as e:
@@ -350,3 +319,5 @@ async def extract_batch(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create extraction job",
         )
+    finally:
+        rec.close()
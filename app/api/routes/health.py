@@ -3,18 +3,25 @@ GET /health Endpoint
 """
 
 from fastapi import APIRouter
-from datetime import datetime, timezone
+from fastapi.responses import ORJSONResponse
 import logging
+import time
 
 from app.models.responses import HealthResponse
 from app.database import get_db
+from app.config import HEALTH_DB_PROBE_TTL_SEC
 
 logger = logging.getLogger(__name__)
 
 # No prefix here; mount as: app.include_router(health_router, prefix="/health")
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
+# monotonic time of the last successful DB probe; failures are never cached
+_LAST_OK_TS = float("-inf")
 
+
+# Plain def: the DB probe may wait for a pooled connection, so FastAPI runs it
+# in the threadpool rather than on the event loop.
 @router.get(
     "",
     response_model=HealthResponse,
@@ -27,7 +34,7 @@ router = APIRouter()
         200: {"description": "Health status payload"},
     },
 )
-async def health_check() -> HealthResponse:
+def health_check() -> HealthResponse:
     """
     Returns a HealthResponse with:
     - status: 'healthy' | 'unhealthy'
@@ -35,10 +42,14 @@ async def health_check() -> HealthResponse:
     - database: { connected: bool, error?: str }
     - system: { status: 'ok' | 'error' }
     """
-    ts = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    global _LAST_OK_TS
+    ts = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
     try:
-        with get_db() as conn:
-            conn.execute("SELECT 1").fetchone()
+        now = time.monotonic()
+        if now - _LAST_OK_TS >= HEALTH_DB_PROBE_TTL_SEC:
+            with get_db() as conn:
+                conn.execute("SELECT 1").fetchone()
+            _LAST_OK_TS = now
         return HealthResponse(
             status="healthy",
             timestamp=ts,
@@ -46,6 +57,7 @@ async def health_check() -> HealthResponse:
             system={"status": "ok"},
         )
     except Exception as e:
+        _LAST_OK_TS = float("-inf")
         logger.exception("Health check failed")
         return HealthResponse(
             status="unhealthy",
@@ -2,40 +2,62 @@
 GET /jobs/{job_id}, /jobs/{job_id}/result Endpoints
 """
 from fastapi import APIRouter, HTTPException, status, Path, Request
-import json
+from fastapi.responses import ORJSONResponse
+import orjson
 from app.models.responses import JobStatusResponse, JobResultResponse
 from app.database import get_db
-from fastapi.responses import JSONResponse
 
 from app.utils.debug_recorder import DebugRequestRecorder
-router = APIRouter()
+from app.utils.job_writer import pending_job_created_at
+from app.utils.job_manager import live_job_progress
+router = APIRouter(default_response_class=ORJSONResponse)
 
+# Constant SQL text per query so sqlite3's per-connection statement cache is hit
+# on every poll; job_id is the PRIMARY KEY, so lookups use its unique index.
+_STATUS_SQL = "SELECT job_id, status, progress, created_at, completed_at FROM jobs WHERE job_id = ?"
+
+
+# Plain def: FastAPI runs it in the threadpool, so waiting for a pooled DB
+# connection when all DB_POOL_SIZE are borrowed never blocks the event loop.
 @router.get("/{job_id}", response_model=JobStatusResponse)
-async def get_job_status(job_id: str = Path(...), request: Request = None):
+def get_job_status(job_id: str = Path(...), request: Request = None):
     rec = DebugRequestRecorder().start(
         route="/jobs/{job_id}",
         method=(request.method if request else "GET"),
-        headers=(dict(request.headers) if request else {}),
-        query=(dict(request.query_params) if request else {}),
+        headers=(request.headers if request else {}),  # recorder copies only when enabled
+        query=(request.query_params if request else {}),
     )
-    with get_db() as conn:
-        row = conn.execute(
-            "SELECT job_id, status, progress, created_at, completed_at FROM jobs WHERE job_id = ?",
-            (job_id,)
-        ).fetchone()
-        if not row:
-            rec.save_response(status.HTTP_404_NOT_FOUND, {"detail": f"Job {job_id} not found"})
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
-        resp = JobStatusResponse(
-            job_id=row["job_id"],
-            status=row["status"],
-            progress=row["progress"],
-            created_at=row["created_at"],
-            completed_at=row["completed_at"]
-        )
-        payload = resp.model_dump() if hasattr(resp, "model_dump") else (resp.dict() if hasattr(resp, "dict") else resp)
-        rec.save_response(200, payload)
-        return resp
+    try:
+        with get_db() as conn:
+            row = conn.execute(_STATUS_SQL, (job_id,)).fetchone()
+            if not row:
+                created_at = pending_job_created_at(request.app, job_id) if request else None
+                if created_at is not None:
+                    # row is still waiting in the batched writer
+                    resp = JobStatusResponse.model_construct(job_id=job_id, status="queued", progress=0, created_at=created_at)
+                    rec.save_response(200, resp)
+                    return resp
+                rec.save_response(status.HTTP_404_NOT_FOUND, {"detail": f"Job {job_id} not found"})
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
+            # columns bound positionally, in _STATUS_SQL order
+            row_job_id, job_status, progress, created_at, completed_at = row
+            if completed_at is None:
+                # intermediate progress is kept in memory by the running job, not in the row
+                live = live_job_progress(job_id)
+                if live is not None:
+                    job_status, progress = live
+            # trusted DB values: build without re-running validation
+            resp = JobStatusResponse.model_construct(
+                job_id=row_job_id,
+                status=job_status,
+                progress=progress,
+                created_at=created_at,
+                completed_at=completed_at
+            )
+            rec.save_response(200, resp)
+            return resp
+    finally:
+        rec.close()
 
 def has_openai_auth_error(result: dict) -> bool:
     """
@@ -56,45 +78,67 @@ def has_openai_auth_error(result: dict) -> bool:
         err_str = e.get("error")
         if not isinstance(err_str, str):
             continue
+        # OpenAI emits the code in lowercase; only lowercase the message if that misses
+        if "invalid_api_key" in err_str:
+            return True
         low = err_str.lower()
         if "error 401" in low or "invalid_api_key" in low:
             return True
     return False
 
 
+# Only the columns the response uses; the (possibly large) result blob is read
+# only once the job is terminal, so in-progress polls never pull it.
+_RESULT_SQL = (
+    "SELECT job_id, status, error_message, created_at, completed_at, "
+    "CASE WHEN status IN ('completed', 'failed') THEN result END AS result "
+    "FROM jobs WHERE job_id = ?"
+)
+
+
+# Plain def, like the status poll: reading and decoding a large result blob
+# happens in the threadpool, not on the event loop.
 @router.get("/{job_id}/result", response_model=JobResultResponse)
-async def get_job_result(job_id: str = Path(...), request: Request = None):
+def get_job_result(job_id: str = Path(...), request: Request = None):
     rec = DebugRequestRecorder().start(
         route="/jobs/{job_id}/result",
         method=(request.method if request else "GET"),
-        headers=(dict(request.headers) if request else {}),
-        query=(dict(request.query_params) if request else {}),
+        headers=(request.headers if request else {}),  # recorder copies only when enabled
+        query=(request.query_params if request else {}),
     )
-    with get_db() as conn:
-        row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
-        if not row:
-            rec.save_response(status.HTTP_404_NOT_FOUND, {"detail": f"Job {job_id} not found"})
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
-        if row["status"] not in ["completed", "failed"]:
-            rec.save_response(status.HTTP_400_BAD_REQUEST, {"detail": f"Job {job_id} is not yet completed"})
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Job {job_id} is not yet completed")
+    try:
+        with get_db() as conn:
+            row = conn.execute(_RESULT_SQL, (job_id,)).fetchone()
+            if not row and request and pending_job_created_at(request.app, job_id) is not None:
+                rec.save_response(status.HTTP_400_BAD_REQUEST, {"detail": f"Job {job_id} is not yet completed"})
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Job {job_id} is not yet completed")
+            if not row:
+                rec.save_response(status.HTTP_404_NOT_FOUND, {"detail": f"Job {job_id} not found"})
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
+            # columns bound positionally, in _RESULT_SQL order
+            row_job_id, job_status, error_message, created_at, completed_at, raw_result = row
+            if job_status not in ("completed", "failed"):
+                rec.save_response(status.HTTP_400_BAD_REQUEST, {"detail": f"Job {job_id} is not yet completed"})
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Job {job_id} is not yet completed")
 
-        result = json.loads(row["result"]) if row["result"] else None
-        resp = JobResultResponse(
-            job_id=row["job_id"],
-            status=row["status"],
-            result=result,
-            error_message=row["error_message"],
-            created_at=row["created_at"],
-            completed_at=row["completed_at"]
-        )
-        payload = resp.model_dump() if hasattr(resp, "model_dump") else (resp.dict() if hasattr(resp, "dict") else resp)
+            result = orjson.loads(raw_result) if raw_result else None
+            resp = JobResultResponse.model_construct(
+                job_id=row_job_id,
+                status=job_status,
+                result=result,
+                error_message=error_message,
+                created_at=created_at,
+                completed_at=completed_at
+            )
 
-        # --- Use helper function here ---
-        if has_openai_auth_error(result):
-            rec.save_response(status.HTTP_401_UNAUTHORIZED, payload)
-            return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content=payload)
-        # --------------------------------
+            # --- Use helper function here ---
+            if has_openai_auth_error(result):
+                payload = resp.model_dump()
+                rec.save_response(status.HTTP_401_UNAUTHORIZED, payload)
+                return ORJSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content=payload)
+            # --------------------------------
 
-        rec.save_response(200, payload)
-        return resp
\ No newline at end of file
+            rec.save_response(200, resp)
+            return resp
+    finally:
+        rec.close()
\ No newline at end of file
@@ -7,25 +7,45 @@ ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
 DATABASE_URL = os.getenv("DATABASE_URL", "resume_analyzer.db")
 
 MAX_FILE_SIZE =  5* 1024 * 1024  # 5MB
+UPLOAD_CHUNK_SIZE = 64 * 1024            # read uploads in 64KB chunks
+UPLOAD_SPOOL_MAX_BYTES = 1 * 1024 * 1024  # uploads above 1MB spill to a temp file
+MAX_UPLOAD_BODY_BYTES = MAX_FILE_SIZE + 256 * 1024  # whole multipart body: file + form fields
 
 MAX_JOBS_PER_API_KEY = 20
 MAX_JOBS_PER_USER = 1
+RATE_LIMIT_FLUSH_SEC = 60          # copy in-memory job counters to the rate_limit_* tables
 JOB_CLEANUP_MINUTES = 60
 
 # --- added ---
 DB_BUSY_TIMEOUT_MS = 5000          # 5s wait on locks for the cleanup connection
+DB_POOL_SIZE = 8                   # max pooled SQLite connections per process
 CLEANUP_INTERVAL_SECONDS = 3600    # run cleanup every hour (if scheduler is used)
+HEALTH_DB_PROBE_TTL_SEC = 1.0      # reuse a successful /health DB probe for this long
 # --------------
 
 OPENAI_API_URL = "https://api.openai.com/v1/responses"
 OPENAI_TIMEOUT = 300
+OPENAI_HTTP2 = True                # multiplex calls over one TLS connection (needs the h2 package)
+OPENAI_HTTP_MAX_KEEPALIVE = 80     # idle pooled connections kept open (4x default per-key concurrency)
+OPENAI_HTTP_MAX_CONNECTIONS = 64   # per-client connection cap (sync calls and batch fan-out)
 
 CHARS_PER_TOKEN = 4
 MIN_OUTPUT_TOKENS = 16
 EXTRACT_TOKEN_MULTIPLIER = 8
 CLASSIFY_DEFAULT_TOKENS = 128
 
-PARALLEL_STAGGER_DELAY = 0.25  # 250ms
+# Background job workers (bounded pool shared by /extract/* and /ai/action)
+AI_JOB_WORKERS = int(os.getenv("AI_JOB_WORKERS", "8"))
+JOB_SHUTDOWN_DRAIN_SEC = 30        # max wait for in-flight jobs on shutdown
+JOB_WRITE_QUEUE_MAX = 10000        # pending job-row inserts before falling back to direct writes
+JOB_WRITE_BATCH_MAX = 64           # rows per multi-row INSERT
+JOB_WRITE_FLUSH_MS = 10            # how long the writer gathers rows before flushing
+
+# Content-hash caches (per process): re-runs on the same PDF skip parsing, and
+# identical extract/classify requests skip the OpenAI call. 0 entries disables.
+PDF_TEXT_CACHE_MAX_ENTRIES = 64
+RESULT_CACHE_MAX_ENTRIES = 256
+RESULT_CACHE_TTL_SEC = 3600
 
 PROMPTS_DIR = "prompts"
 
@@ -34,6 +54,8 @@ PROMPTS_DIR = "prompts"
 DEBUG_REQUEST_LOG_ENABLED = True  # default: enabled
 DEBUG_REQUEST_LOG_DIR = "./prl"   # per-request logs directory
 DEBUG_REQUEST_LOG_REDACT_KEYS = ""  # comma-separated extra keys to redact (in addition to built-ins)
+DEBUG_REQUEST_LOG_SPLIT_FILES = False  # True: one .json/.txt file per record instead of events.jsonl
+DEBUG_REQUEST_LOG_QUEUE_MAX = 256  # pending background debug writes; beyond this records are dropped
 
 # --- Cleanup policy for per-request logs ---
 PRL_MAX_BYTES = 50 * 1024 * 1024     # keep logs under 100 MB total
@@ -50,6 +72,22 @@ OPENAI_RPM_FAIL_FAST = os.getenv("OPENAI_RPM_FAIL_FAST", "0") == "1"
 # Default 1 hour: effectively "wait until free" for typical bursts.
 OPENAI_RPM_MAX_DELAY_MS = int(os.getenv("OPENAI_RPM_MAX_DELAY_MS", "3600000"))
 
+# Token-per-minute budget per API key, paced alongside RPM by batch fan-out.
+OPENAI_TPM_PER_KEY = int(os.getenv("OPENAI_TPM_PER_KEY", "200000"))
+
+# Opt-in: send all file-backed batch prompt_types as ONE request over a single copy
+# of the document (fewer requests and input tokens); per-prompt calls remain the
+# fallback for any prompt_type the merged answer misses.
+EXTRACT_MULTIPLEX_PROMPTS = os.getenv("EXTRACT_MULTIPLEX_PROMPTS", "0") == "1"
+
+# Largest output budget a single request may ask for (model output limit); caps
+# the merged multiplexed request, whose budget is per-prompt tokens x prompts.
+OPENAI_MAX_OUTPUT_TOKENS = int(os.getenv("OPENAI_MAX_OUTPUT_TOKENS", "16384"))
+
+# Batch prompts retry 429/5xx/transport errors with capped exponential backoff.
+OPENAI_RETRY_MAX_ATTEMPTS = 5
+OPENAI_RETRY_BACKOFF_CAP_SEC = 30
+
 # Cap concurrent in-flight OpenAI calls per API key. 0 disables.
 OPENAI_MAX_CONCURRENCY_PER_KEY = int(os.getenv("OPENAI_MAX_CONCURRENCY_PER_KEY", "20"))
 
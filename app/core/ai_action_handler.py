@@ -7,44 +7,81 @@ AI Action Logic (single action) — aligned with extract_single flow.
 - Custom prompt: used verbatim; placeholders {{PDF_TEXT}} and {{USER_RESUME_JSON}} are replaced.
 """
 
-import json
-from typing import Optional, Dict, Tuple
+import re
+
+import orjson
+from types import MappingProxyType
+from typing import BinaryIO, Optional, FrozenSet, Mapping, Tuple
 
 from app.core.pdf_processor import extract_pdf_text
 from app.core.openai_client import call_openai_api, extract_text_from_response
-from app.core.token_calculator import approx_tokens_from_chars, calculate_max_output_tokens
-from app.core.json_processor import extract_first_json
+from app.core.token_calculator import calculate_max_output_tokens
+from app.config import CHARS_PER_TOKEN
+from app.core.json_processor import parse_leading_json
 from app.utils.job_manager import update_job_status
+from app.utils.prompt_utils import build_prompt
 from app.utils.rate_limiter import check_and_increment_rate_limits, decrement_rate_limits
-from app.utils.debug_recorder import DebugRequestRecorder
+from app.utils.debug_recorder import DebugRequestRecorder, write_in_background
 
 
 def _save_action_artifacts(
     rec: "DebugRequestRecorder",
     *,
     input_filename: str | None,
-    input_bytes: bytes | None,
+    input_bytes: BinaryIO | None,
     pdf_text: str | None,
     resume_json_raw: str | None,
     final_prompt: str | None,
+    combined_len: int | None = None,
+    pdf_text_len: int | None = None,
+    resume_json_len: int | None = None,
 ) -> None:
     """
     Save AIAction artifacts under the handler's PRL folder.
     No-ops if PRL is disabled.
+
+    The PDF is snapshotted right away (its spool is closed when the job ends)
+    and, like the text artifacts, written by the background writer so the
+    model call isn't delayed by them.
     """
     try:
-        # PDF bytes
+        # PDF bytes (streamed from the spooled upload)
         if input_bytes:
             name = f"input__{input_filename}" if input_filename else "input.pdf"
             rec.save_bytes(name, input_bytes)
+    except Exception:
+        pass
+    write_in_background(
+        _write_text_artifacts,
+        rec,
+        pdf_text=pdf_text,
+        resume_json_raw=resume_json_raw,
+        final_prompt=final_prompt,
+        combined_len=combined_len,
+        pdf_text_len=pdf_text_len,
+        resume_json_len=resume_json_len,
+    )
+
+
+def _write_text_artifacts(
+    rec: "DebugRequestRecorder",
+    *,
+    pdf_text: str | None,
+    resume_json_raw: str | None,
+    final_prompt: str | None,
+    combined_len: int | None = None,
+    pdf_text_len: int | None = None,
+    resume_json_len: int | None = None,
+) -> None:
+    try:
         # PDF text
         if pdf_text:
             rec.save_text("pdf_text.txt", pdf_text)
         # User resume JSON (raw or pretty json if valid)
         if resume_json_raw is not None and resume_json_raw != "":
             try:
-                parsed = json.loads(resume_json_raw)
-                rec.save_text("user_resume.json", json.dumps(parsed, ensure_ascii=False, indent=2))
+                parsed = orjson.loads(resume_json_raw)
+                rec.save_text("user_resume.json", orjson.dumps(parsed, option=orjson.OPT_INDENT_2).decode())
             except Exception:
                 rec.save_text("user_resume.json", resume_json_raw)
         # Final prompt
@@ -65,23 +102,28 @@ def _save_action_artifacts(
         pass
 
 
-from app.utils.prompt_utils import build_prompt
+# Both placeholders substituted in one scan of the template
+_PH_RE = re.compile(r"\{\{(PDF_TEXT|USER_RESUME_JSON)\}\}")
 
 # Allowed (tab, action) combinations mirrored from UI (Availability has no defaults)
-_ALLOWED_BY_TAB = {
-    "Contact": {"AI Suggestions", "Validate"},
-    "Soft Skills": {"AI Suggestions", "Validate", "Enhance"},
-    "Tech Skills": {"AI Suggestions", "Validate"},
-    "About": {"AI Suggestions", "Validate", "Enhance", "Shorten"},
-    "Experience": {"AI Suggestions", "Validate", "Enhance"},
-    "Projects": {"AI Suggestions", "Validate", "Enhance"},
-    "Education": {"AI Suggestions", "Validate"},
-    "Certifications": {"AI Suggestions", "Validate"},
-    "Availability": set(),  # no defaults
-}
+_ALLOWED_BY_TAB: Mapping[str, FrozenSet[str]] = MappingProxyType({
+    "Contact": frozenset({"AI Suggestions", "Validate"}),
+    "Soft Skills": frozenset({"AI Suggestions", "Validate", "Enhance"}),
+    "Tech Skills": frozenset({"AI Suggestions", "Validate"}),
+    "About": frozenset({"AI Suggestions", "Validate", "Enhance", "Shorten"}),
+    "Experience": frozenset({"AI Suggestions", "Validate", "Enhance"}),
+    "Projects": frozenset({"AI Suggestions", "Validate", "Enhance"}),
+    "Education": frozenset({"AI Suggestions", "Validate"}),
+    "Certifications": frozenset({"AI Suggestions", "Validate"}),
+    "Availability": frozenset(),  # no defaults
+})
+
+# Flattened once for O(1) checks (also used by the /ai/action route)
+_KNOWN_TABS = frozenset(_ALLOWED_BY_TAB)
+_ALLOWED_PAIRS = frozenset((t, a) for t, actions in _ALLOWED_BY_TAB.items() for a in actions)
 
 # Focused default templates for (tab, action). Minimal, concise, and rely on placeholders.
-_FOCUSED_PROMPTS: Dict[Tuple[str, str], str] = {
+_FOCUSED_PROMPTS: Mapping[Tuple[str, str], str] = MappingProxyType({
     ("Contact", "AI Suggestions"): "Using {{PDF_TEXT}} or {{USER_RESUME_JSON}}, suggest missing/ambiguous Contact fixes as strict JSON.",
     ("Contact", "Validate"): "Validate Contact fields found in {{PDF_TEXT}} or {{USER_RESUME_JSON}}; output strict JSON report of issues only.",
     ("Soft Skills", "AI Suggestions"): "From {{PDF_TEXT}} or {{USER_RESUME_JSON}}, suggest relevant soft skills; avoid duplicates; strict JSON.",
@@ -104,24 +146,26 @@ _FOCUSED_PROMPTS: Dict[Tuple[str, str], str] = {
     ("Certifications", "AI Suggestions"): "Suggest certifications from {{PDF_TEXT}} or {{USER_RESUME_JSON}}; strict JSON.",
     ("Certifications", "Validate"): "Validate certifications vs {{PDF_TEXT}} or {{USER_RESUME_JSON}}; strict JSON.",
     # Availability intentionally omitted (no defaults)
-}
+})
+
+# Every allowed default combo has a focused template (and vice versa)
+assert _ALLOWED_PAIRS == frozenset(_FOCUSED_PROMPTS), "allowed (tab, action) set and focused templates diverged"
 
 class AIActionHandler:
     def _is_allowed_default(self, tab: str, action: str) -> bool:
-        allowed = _ALLOWED_BY_TAB.get(tab, set())
-        return action in allowed
+        return (tab, action) in _ALLOWED_PAIRS
 
     def _focused_template_for(self, tab: str, action: str) -> str:
-        key = (tab, action)
-        if key not in _FOCUSED_PROMPTS:
+        template = _FOCUSED_PROMPTS.get((tab, action))
+        if template is None:
             raise ValueError(f"No default focused prompt for tab='{tab}' action='{action}'")
-        return _FOCUSED_PROMPTS[key]
+        return template
 
     def process_action(
         self,
         job_id: str,
         request_data,               # AIActionRequest
-        file_content: Optional[bytes],
+        file_content: Optional[BinaryIO],
         filename: Optional[str],
     ):
         # Rate-limit gate (job is created by the route); set processing status
@@ -146,10 +190,13 @@ class AIActionHandler:
                 pdf_text = extract_pdf_text(file_content)
 
             resume_json_text = request_data.resume_json or ""
-            # Combine for token budgeting
-            combined_len = len(pdf_text) + len(resume_json_text)
+            # Lengths computed once; reused for token budgeting and the PRL metrics
+            pdf_text_len = len(pdf_text)
+            resume_json_len = len(resume_json_text)
+            combined_len = pdf_text_len + resume_json_len
 
-            input_tokens = approx_tokens_from_chars(combined_len)
+            # Inlined approx_tokens_from_chars
+            input_tokens = combined_len // CHARS_PER_TOKEN + 1
 
             update_job_status(job_id, "processing", 40)
 
@@ -161,9 +208,8 @@ class AIActionHandler:
             # Build final prompt
             if request_data.prompt:
                 # Custom prompt verbatim, keep placeholder substitution
-                base_prompt = request_data.prompt
-                filled_prompt = base_prompt.replace("{{PDF_TEXT}}", pdf_text or "")
-                filled_prompt = filled_prompt.replace("{{USER_RESUME_JSON}}", resume_json_text)
+                subs = {"PDF_TEXT": pdf_text, "USER_RESUME_JSON": resume_json_text}
+                filled_prompt = _PH_RE.sub(lambda m: subs[m.group(1)], request_data.prompt)
             else:
                 # Defensive check for allowed default combos
                 if not self._is_allowed_default(request_data.tab, request_data.action_type):
@@ -172,8 +218,9 @@ class AIActionHandler:
                 # Focused template + build_prompt
                 document_text = pdf_text if pdf_text else resume_json_text
                 focused_template = self._focused_template_for(request_data.tab, request_data.action_type)
-                prompt_text = build_prompt(document_text, {"prompt_type": request_data.tab, "prompt": focused_template})
-                filled_prompt = prompt_text.replace("{{USER_RESUME_JSON}}", resume_json_text)
+                # Fill resume JSON into the short template, not the document-sized prompt
+                focused_template = focused_template.replace("{{USER_RESUME_JSON}}", resume_json_text)
+                filled_prompt = build_prompt(document_text, {"prompt_type": request_data.tab, "prompt": focused_template})
 
             
             if rec.enabled and rec.dir:
@@ -184,6 +231,9 @@ class AIActionHandler:
                     pdf_text=pdf_text,
                     resume_json_raw=resume_json_text,
                     final_prompt=filled_prompt,
+                    combined_len=combined_len,
+                    pdf_text_len=pdf_text_len,
+                    resume_json_len=resume_json_len,
                 )
            # Call OpenAI
  
@@ -201,10 +251,7 @@ class AIActionHandler:
 
             # Extract JSON like extraction handler
             raw = extract_text_from_response(response).strip()
-            try:
-                result = json.loads(raw)
-            except json.JSONDecodeError:
-                result = extract_first_json(raw)
+            result = parse_leading_json(raw)
 
             update_job_status(job_id, "completed", 100, result=result)
             rec.save_response(200, {"job_id": job_id, "status": "completed"})
@@ -213,4 +260,5 @@ class AIActionHandler:
             update_job_status(job_id, "failed", error_message=str(e))
             rec.save_exception(e)
         finally:
+            rec.close()
             decrement_rate_limits(request_data.user_id, request_data.openai_api_key)
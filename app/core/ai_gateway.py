@@ -7,7 +7,8 @@ Pinned dependency:
 
 What it does:
 - Enforces per-API-key RPM (requests per minute) using pyrate-limiter.
-- Caps in-flight concurrency per API key using a keyed threading.Semaphore.
+- Caps in-flight concurrency per API key using a keyed threading.Semaphore
+  (asyncio.Semaphore for the async variant).
 - Translates rate-limit breaches into proper HTTP 429 (with Retry-After).
 - Centralizes all outbound OpenAI traffic so no path can bypass limits.
 - Ready to switch to Redis-backed limiter later without touching call sites.
@@ -19,6 +20,13 @@ Usage:
         api_key, model, prompt_text, max_output_tokens, temperature_zero
     )
 
+Async code paths:
+    resp = await call_openai_rate_limited_async(
+        api_key, model, prompt_text, max_output_tokens, temperature_zero
+    )
+    Waiting for a slot or an RPM token suspends the coroutine instead of
+    parking a thread; the blocking HTTP call itself runs via asyncio.to_thread.
+
 Batch execution:
     Pass call_openai_rate_limited into your parallel executor so EACH
     prompt consumes an RPM token and a concurrency slot.
@@ -27,7 +35,9 @@ Batch execution:
 from __future__ import annotations
 
 from typing import Any, Dict, Optional
+import asyncio
 import os
+import weakref
 from threading import Lock, Semaphore
 
 from fastapi import HTTPException
@@ -94,7 +104,27 @@ def _build_limiter() -> Limiter:
 
     return Limiter(rate, bucket_class=bucket_class, bucket_kwargs=bucket_kwargs)
 
-_limiter: Limiter = _build_limiter()
+# Limits are per key, so keys never share a bucket; striping only spreads them
+# over independent limiters (each with its own lock) instead of one shared one.
+_LIMITER_STRIPES = 16  # power of two, so a mask picks the stripe
+
+class _StripedLimiter:
+    """Routes each api_key to one of _LIMITER_STRIPES limiters by hash."""
+
+    def __init__(self, stripes: int = _LIMITER_STRIPES):
+        self._stripes = [_build_limiter() for _ in range(stripes)]
+        self._mask = stripes - 1
+
+    def stripe_for(self, api_key: str) -> Limiter:
+        return self._stripes[hash(api_key) & self._mask]
+
+    def ratelimit(self, api_key: str, delay: bool = True):
+        return self.stripe_for(api_key).ratelimit(api_key, delay=delay)
+
+    def try_acquire(self, api_key: str, *args, **kwargs):
+        return self.stripe_for(api_key).try_acquire(api_key, *args, **kwargs)
+
+_limiter = _StripedLimiter()
 
 # -------------------------- Per-Key Concurrency Guard -------------------------
 
@@ -105,10 +135,16 @@ def _get_sem_for(api_key: str) -> Optional[Semaphore]:
     """
     Return a semaphore for this api_key if concurrency limiting is enabled.
     Creates on first use, caches thereafter. Returns None if disabled.
+
+    Double-checked: the common hit path is a lock-free dict read (atomic under
+    the GIL); _sem_lock is only taken to create a missing entry exactly once.
     """
     max_conc = OPENAI_MAX_CONCURRENCY_PER_KEY
     if max_conc <= 0:
         return None
+    sem = _sems.get(api_key)
+    if sem is not None:
+        return sem
     with _sem_lock:
         sem = _sems.get(api_key)
         if sem is None:
@@ -116,6 +152,46 @@ def _get_sem_for(api_key: str) -> Optional[Semaphore]:
             _sems[api_key] = sem
         return sem
 
+# asyncio.Semaphore binds to the loop it is first used on, so keep one map per loop.
+# No lock needed: get-or-create below never awaits, so it is atomic on the loop.
+_async_sems: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+
+def _get_async_sem_for(api_key: str) -> Optional[asyncio.Semaphore]:
+    """Async counterpart of _get_sem_for (must be called on the running loop)."""
+    max_conc = OPENAI_MAX_CONCURRENCY_PER_KEY
+    if max_conc <= 0:
+        return None
+    loop = asyncio.get_running_loop()
+    sems = _async_sems.get(loop)
+    if sems is None:
+        sems = _async_sems[loop] = {}
+    sem = sems.get(api_key)
+    if sem is None:
+        sem = sems[api_key] = asyncio.Semaphore(max_conc)
+    return sem
+
+# -------------------------- 429 Translation ----------------------------------
+
+def _reset_in_from(e: BucketFullException) -> Optional[float]:
+    """Seconds until a token frees up, if the limiter told us (be defensive)."""
+    try:
+        meta = getattr(e, "meta_info", {}) or {}
+        # meta may include 'reset_in' (or 'remaining_time') seconds
+        for k in ("reset_in", "remaining_time"):
+            if k in meta:
+                return float(meta[k])
+    except Exception:
+        pass
+    return None
+
+def _rate_limit_error(e: BucketFullException) -> OpenAIRateLimitError:
+    """Convert pyrate-limiter exception into a clean HTTP 429."""
+    detail = (
+        f"OpenAI RPM limit exceeded for API key. "
+        f"Configured limit: {OPENAI_RPM_PER_KEY}/minute."
+    )
+    return OpenAIRateLimitError(detail=detail, retry_after=_reset_in_from(e))
+
 # -------------------------- Public Gateway Function ---------------------------
 
 def call_openai_rate_limited(
@@ -159,22 +235,52 @@ def call_openai_rate_limited(
                 return call_openai_api(api_key, model, prompt_text, max_output_tokens, temperature_zero)
 
         except BucketFullException as e:
-            # Convert pyrate-limiter exception into a clean HTTP 429
-            reset_in: Optional[float] = None
-            # pyrate-limiter 3.9.0 exposes meta_info; be defensive
+            raise _rate_limit_error(e)
+
+    finally:
+        if sem is not None:
+            sem.release()
+
+# Poll interval while waiting for an RPM token when the limiter gives no hint
+_ASYNC_RPM_RETRY_SEC = 0.05
+
+async def call_openai_rate_limited_async(
+    api_key: str,
+    model: str,
+    prompt_text: str,
+    max_output_tokens: Optional[int],
+    temperature_zero: bool,
+) -> Dict[str, Any]:
+    """
+    Same contract as call_openai_rate_limited, for code running on the event loop.
+
+    Behavior:
+      - Waits on a per-key asyncio.Semaphore (no thread is held while waiting).
+      - Takes an RPM token with limiter.try_acquire:
+          * OPENAI_RPM_FAIL_FAST = True: raises OpenAIRateLimitError (HTTP 429).
+          * otherwise: awaits the limiter's reset hint (or a short poll) and retries.
+      - Runs the blocking low-level client in a worker thread.
+    """
+    sem = _get_async_sem_for(api_key)
+    if sem is not None:
+        await sem.acquire()
+
+    try:
+        while True:
             try:
-                meta = getattr(e, "meta_info", {}) or {}
-                # meta may include 'reset_in' seconds
-                if "reset_in" in meta:
-                    reset_in = float(meta["reset_in"])
-            except Exception:
-                pass
-
-            detail = (
-                f"OpenAI RPM limit exceeded for API key. "
-                f"Configured limit: {OPENAI_RPM_PER_KEY}/minute."
-            )
-            raise OpenAIRateLimitError(detail=detail, retry_after=reset_in)
+                _limiter.try_acquire(api_key)
+                break
+            except BucketFullException as e:
+                if OPENAI_RPM_FAIL_FAST:
+                    raise _rate_limit_error(e)
+                wait = _reset_in_from(e)
+                await asyncio.sleep(wait if wait and wait > 0 else _ASYNC_RPM_RETRY_SEC)
+
+        # Local import to avoid circular imports at startup
+        from app.core.openai_client import call_openai_api
+        return await asyncio.to_thread(
+            call_openai_api, api_key, model, prompt_text, max_output_tokens, temperature_zero
+        )
 
     finally:
         if sem is not None:
@@ -1,12 +1,14 @@
 """
 Classification Processing Logic
 """
-import json
-from app.core.pdf_processor import extract_pdf_text
-from app.core.openai_client import call_openai_api
-from app.core.token_calculator import approx_tokens_from_chars, calculate_max_output_tokens
+from typing import BinaryIO
+from app.core.result_cache import content_digest, cached_pdf_text, get_result, put_result
+from app.core.openai_client import call_openai_api, extract_text_from_response
+from app.core.json_processor import parse_leading_json
+from app.config import CHARS_PER_TOKEN
+from app.core.token_calculator import calculate_max_output_tokens
 from app.utils.rate_limiter import check_and_increment_rate_limits, decrement_rate_limits
-from app.utils.job_manager import update_job_status, create_job
+from app.utils.job_manager import update_job_status
 
 class ClassificationHandler:
     def build_classify_prompt(self, pdf_text: str) -> str:
@@ -28,15 +30,22 @@ Constraints:
 {pdf_text}
 --- END OF TEXT ---"""
 
-    async def process_classification(self, job_id: str, request_data, file_content: bytes, filename: str):
-        create_job(job_id, request_data.user_id, request_data.openai_api_key)
+    def process_classification(self, job_id: str, request_data, file_content: BinaryIO, filename: str):
         update_job_status(job_id, "processing", 10)
-        if not check_and_increment_rate_limits(request_data.user_id, request_data.openai_api_key):
-            update_job_status(job_id, "failed", error_message="Rate limit exceeded")
+        ok, reason = check_and_increment_rate_limits(request_data.user_id, request_data.openai_api_key)
+        if not ok:
+            update_job_status(job_id, "failed", error_message=f"Rate limit exceeded: {reason}")
             return
         try:
-            pdf_text = extract_pdf_text(file_content)
-            input_tokens = approx_tokens_from_chars(len(pdf_text))
+            digest = content_digest(file_content)
+            cache_key = (digest, "classify", request_data.model, request_data.max_output_tokens,
+                         request_data.temperature_zero, request_data.openai_api_key)
+            result = get_result(cache_key)
+            if result is not None:
+                update_job_status(job_id, "completed", 100, result=result)
+                return
+            pdf_text = cached_pdf_text(digest, file_content)
+            input_tokens = len(pdf_text) // CHARS_PER_TOKEN + 1
             update_job_status(job_id, "processing", 40)
             max_output_tokens = calculate_max_output_tokens(input_tokens, "classify", request_data.max_output_tokens)
             prompt_text = self.build_classify_prompt(pdf_text)
@@ -44,13 +53,9 @@ Constraints:
             if response.get("status") != "completed":
                 reason = (response.get("incomplete_details") or {}).get("reason", "unknown")
                 raise RuntimeError(f"OpenAI API failed: {reason}")
-            from app.core.openai_client import extract_text_from_response
-            from app.core.json_processor import extract_first_json
             raw = extract_text_from_response(response).strip()
-            try:
-                result = json.loads(raw)
-            except json.JSONDecodeError:
-                result = extract_first_json(raw)
+            result = parse_leading_json(raw)
+            put_result(cache_key, result)
             update_job_status(job_id, "completed", 100, result=result)
         except Exception as e:
             update_job_status(job_id, "failed", error_message=str(e))
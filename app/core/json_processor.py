@@ -2,33 +2,50 @@
 JSON Parsing and Extraction
 """
 import json
+import re
+
+import orjson
+
+_DECODER = json.JSONDecoder()
+
+def parse_leading_json(text: str):
+    """
+    Parse model output that should be JSON but may carry prose around it.
+    Whole-string orjson parse first; otherwise a single raw_decode pass from
+    the first '{' (trailing text is ignored). The brace scanner in
+    extract_first_json remains the last resort.
+    """
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        pass
+    start = text.find("{")
+    if start != -1:
+        try:
+            return _DECODER.raw_decode(text, start)[0]
+        except json.JSONDecodeError:
+            pass
+    return extract_first_json(text)
+
+# Tokens that matter to brace matching: a whole string literal (escapes honoured;
+# an unterminated one runs to the end of the text) or a single brace. finditer
+# does the skipping in C instead of dispatching per character in Python.
+_STRUCT_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"?|[{}]', re.S)
 
 def extract_first_json(text: str) -> dict:
     start = text.find("{")
     if start == -1:
         raise ValueError("No JSON object start '{' found")
     depth, end = 0, None
-    in_str = False
-    esc = False
-    for i in range(start, len(text)):
-        ch = text[i]
-        if in_str:
-            if esc:
-                esc = False
-            elif ch == "\\":
-                esc = True
-            elif ch == '"':
-                in_str = False
-        else:
-            if ch == '"':
-                in_str = True
-            elif ch == "{":
-                depth += 1
-            elif ch == "}":
-                depth -= 1
-                if depth == 0:
-                    end = i + 1
-                    break
+    for m in _STRUCT_RE.finditer(text, start):
+        ch = text[m.start()]
+        if ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                end = m.end()
+                break
     if end is None:
         raise ValueError("Unbalanced braces; could not find JSON object end '}'")
-    return json.loads(text[start:end])
+    return orjson.loads(text[start:end])
@@ -1,38 +1,178 @@
 """
 OpenAI API Communication
 """
-import requests
-from typing import Dict, Any
-from app.config import OPENAI_API_URL, OPENAI_TIMEOUT
+import asyncio
+import atexit
+import threading
+import httpx
+import orjson
+from typing import Callable, Dict, Any, Optional, Tuple
+from app.config import (
+    OPENAI_API_URL, OPENAI_TIMEOUT, OPENAI_HTTP2, OPENAI_HTTP_MAX_KEEPALIVE, OPENAI_HTTP_MAX_CONNECTIONS,
+)
 from app.core.token_calculator import model_supports_temperature
 
-def call_openai_api(api_key: str, model: str, prompt: str, max_output_tokens: int, temperature_zero: bool) -> Dict[str, Any]:
+# One pooled client per process, shared by every api_key (auth is a per-request
+# header), so TLS is negotiated once instead of on every call. httpx.Client is thread-safe.
+_HTTP = httpx.Client(
+    http2=OPENAI_HTTP2,
+    timeout=OPENAI_TIMEOUT,
+    limits=httpx.Limits(
+        max_connections=OPENAI_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_HTTP_MAX_KEEPALIVE,
+    ),
+)
+
+# Batch fan-out runs on one background event loop with its own AsyncClient.
+# Job threads hand coroutines to it via run_io(); both are created on first use.
+_aio_lock = threading.Lock()
+_aio_loop: Optional[asyncio.AbstractEventLoop] = None
+_AHTTP: Optional[httpx.AsyncClient] = None
+
+def _io_loop() -> asyncio.AbstractEventLoop:
+    global _aio_loop, _AHTTP
+    loop = _aio_loop
+    if loop is not None:
+        return loop
+    with _aio_lock:
+        if _aio_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="openai-io", daemon=True).start()
+            _AHTTP = httpx.AsyncClient(
+                http2=OPENAI_HTTP2,
+                timeout=OPENAI_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=OPENAI_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_HTTP_MAX_KEEPALIVE,
+                ),
+            )
+            _aio_loop = loop
+        return _aio_loop
+
+def run_io(coro):
+    """
+    Run coro on the shared OpenAI I/O loop and block until it finishes.
+    For worker threads only; never call this from inside a running event loop.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _io_loop()).result()
+
+def close_http_client() -> None:
+    global _aio_loop, _AHTTP
+    _HTTP.close()
+    with _aio_lock:
+        loop, client = _aio_loop, _AHTTP
+        _aio_loop = _AHTTP = None
+    if loop is not None:
+        try:
+            asyncio.run_coroutine_threadsafe(_shutdown_io(client), loop).result(timeout=5)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+
+# App shutdown closes the clients explicitly; this covers scripts/workers that
+# import the client without the FastAPI lifecycle. A second close is a no-op.
+atexit.register(close_http_client)
+
+async def _shutdown_io(client: httpx.AsyncClient) -> None:
+    # Cancel batches still in flight (the drain timed out on them) so the job
+    # threads blocked in run_io() get CancelledError instead of waiting forever.
+    me = asyncio.current_task()
+    tasks = [t for t in asyncio.all_tasks() if t is not me]
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await client.aclose()
+
+class OpenAIHTTPError(RuntimeError):
+    """Non-200 reply from OpenAI; keeps the status for retry decisions."""
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"OpenAI API error {status_code}: {text}")
+        self.status_code = status_code
+
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+def is_retryable(exc: BaseException) -> bool:
+    """Rate limits, transient 5xx and connection/timeout errors are worth retrying."""
+    if isinstance(exc, OpenAIHTTPError):
+        return exc.status_code in _RETRY_STATUSES
+    return isinstance(exc, httpx.TransportError)
+
+def _request_parts(api_key: str, model: str, prompt: str, max_output_tokens: int, temperature_zero: bool):
     headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
     payload = {"model": model, "input": prompt, "max_output_tokens": max_output_tokens, "text": {"format": {"type": "json_object"}}}
     if temperature_zero and model_supports_temperature(model):
         payload["temperature"] = 0.0
-    resp = requests.post(OPENAI_API_URL, headers=headers, json=payload, timeout=OPENAI_TIMEOUT)
+    return headers, payload
+
+def _checked_json(resp: httpx.Response) -> Dict[str, Any]:
     if resp.status_code != 200:
-        raise RuntimeError(f"OpenAI API error {resp.status_code}: {resp.text}")
-    return resp.json()
+        raise OpenAIHTTPError(resp.status_code, resp.text)
+    return orjson.loads(resp.content)
 
-def extract_text_from_response(data: Dict[str, Any]) -> str:
-    if isinstance(data.get("output_text"), str):
-        return data["output_text"]
-    if isinstance(data.get("content"), str):
-        return data["content"]
-    for item in data.get("output", []):
+def call_openai_api(api_key: str, model: str, prompt: str, max_output_tokens: int, temperature_zero: bool) -> Dict[str, Any]:
+    headers, payload = _request_parts(api_key, model, prompt, max_output_tokens, temperature_zero)
+    return _checked_json(_HTTP.post(OPENAI_API_URL, headers=headers, content=orjson.dumps(payload)))
+
+async def acall_openai_api(api_key: str, model: str, prompt: str, max_output_tokens: int, temperature_zero: bool) -> Dict[str, Any]:
+    """Async call_openai_api; must run on the I/O loop (see run_io)."""
+    headers, payload = _request_parts(api_key, model, prompt, max_output_tokens, temperature_zero)
+    return _checked_json(await _AHTTP.post(OPENAI_API_URL, headers=headers, content=orjson.dumps(payload)))
+
+_TEXT_TYPES = ("output_text", "text")
+
+# Responses for a given model share one shape. The first walk for a model yields
+# the path to its text, (where, output_idx, content_idx, kind), which is compiled
+# into a straight-line accessor (a few subscripts, no loops) and tried first after.
+_text_accessor_by_model: Dict[str, Callable[[Dict[str, Any]], Optional[str]]] = {}
+
+def _compile_text_path(path: Tuple) -> Callable[[Dict[str, Any]], Optional[str]]:
+    where, i, j, kind = path
+    node = f'd["output"][{int(i)}]' + (f'["content"][{int(j)}]' if where == "content" else "")
+    lines = ["def _acc(d):", f"    n = {node}"]
+    if where == "content":
+        lines += ["    if n.get('type') not in _TEXT_TYPES:", "        return None"]
+    lines.append("    t = n.get('text')")
+    if kind == "str":
+        lines.append("    return t if type(t) is str else None")
+    else:
+        lines.append("    return str(t['value']) if isinstance(t, dict) and 'value' in t else None")
+    ns: Dict[str, Any] = {"_TEXT_TYPES": _TEXT_TYPES}
+    exec(compile("\n".join(lines), "<text-accessor>", "exec"), ns)
+    return ns["_acc"]
+
+def _walk_output(data: Dict[str, Any]) -> Tuple[str, Tuple]:
+    for i, item in enumerate(data.get("output", [])):
         content = item.get("content")
         if isinstance(content, list):
-            for c in content:
-                if isinstance(c, dict) and c.get("type") in ("output_text", "text"):
+            for j, c in enumerate(content):
+                if isinstance(c, dict) and c.get("type") in _TEXT_TYPES:
                     tv = c.get("text")
                     if isinstance(tv, str):
-                        return tv
+                        return tv, ("content", i, j, "str")
                     if isinstance(tv, dict) and "value" in tv:
-                        return str(tv["value"])
+                        return str(tv["value"]), ("content", i, j, "value")
         if isinstance(item.get("text"), str):
-            return item["text"]
+            return item["text"], ("text", i, None, "str")
         if isinstance(item.get("text"), dict) and "value" in item["text"]:
-            return str(item["text"]["value"])
+            return str(item["text"]["value"]), ("text", i, None, "value")
     raise KeyError("No text found in response payload")
+
+def extract_text_from_response(data: Dict[str, Any]) -> str:
+    fast = data.get("output_text")
+    if type(fast) is str:
+        return fast
+    if isinstance(data.get("content"), str):
+        return data["content"]
+    model = data.get("model")
+    if type(model) is not str:
+        return _walk_output(data)[0]
+    accessor = _text_accessor_by_model.get(model)
+    if accessor is not None:
+        try:
+            text = accessor(data)
+        except (KeyError, IndexError, TypeError, AttributeError):
+            text = None
+        if text is not None:
+            return text
+    text, path = _walk_output(data)
+    _text_accessor_by_model[model] = _compile_text_path(path)
+    return text
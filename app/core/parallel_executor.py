@@ -1,41 +1,95 @@
 """
-Parallel Execution with 250ms Stagger
+Parallel Execution, paced by an RPM/TPM token bucket
 """
-import time
-import json
+import asyncio
+import random
 from typing import Dict, List, Any, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from app.config import PARALLEL_STAGGER_DELAY
-from app.core.json_processor import extract_first_json
-from app.core.openai_client import extract_text_from_response
+from app.config import OPENAI_RETRY_MAX_ATTEMPTS, OPENAI_RETRY_BACKOFF_CAP_SEC, OPENAI_MAX_CONCURRENCY_PER_KEY, OPENAI_MAX_OUTPUT_TOKENS
+from app.core.json_processor import parse_leading_json
+from app.core.openai_client import extract_text_from_response, is_retryable, run_io
+from app.core.rate_bucket import bucket_for
+from app.core.token_calculator import approx_tokens_from_chars
 
 DESIRED_KEY_ORDER = ["contact", "soft_skills", "tech_skills", "about", "experience", "projects", "education", "certifications"]
 
-def execute_parallel_extraction(pdf_text: str, prompt_items: List[Dict[str, str]], api_key: str, model: str, max_output_tokens: int, temperature_zero: bool, openai_call_func, prompt_builder_func) -> Dict[str, Any]:
-    def exec_one(item: Dict[str, str], idx: int) -> Tuple[Dict[str, str], Dict[str, Any]]:
-        try:
-            if idx > 0:
-                time.sleep(PARALLEL_STAGGER_DELAY * idx)
-            prompt_text = prompt_builder_func(pdf_text, item)
-            response = openai_call_func(api_key=api_key, model=model, prompt=prompt_text, max_output_tokens=max_output_tokens, temperature_zero=temperature_zero)
-            if response.get("status") != "completed":
-                reason = (response.get("incomplete_details") or {}).get("reason", "unknown")
-                raise RuntimeError(f"API call failed: {reason}")
-            raw_text = extract_text_from_response(response).strip()
+def execute_parallel_extraction(pdf_text: str, prompt_items: List[Dict[str, str]], api_key: str, model: str, max_output_tokens: int, temperature_zero: bool, openai_call_func, prompt_builder_func, multi_prompt_builder_func=None) -> Dict[str, Any]:
+    """
+    Fan the prompts out concurrently on the shared OpenAI I/O loop (no thread per
+    prompt); openai_call_func is a coroutine function such as acall_openai_api.
+    Each call waits for RPM/TPM capacity in the key's bucket instead of a fixed
+    stagger. Blocks the calling (job) thread until every prompt has finished.
+
+    With multi_prompt_builder_func, all prompts first go out as ONE request over a
+    single copy of pdf_text, with its output budget capped at OPENAI_MAX_OUTPUT_TOKENS;
+    any prompt_type missing or empty in that answer (or all of them, if the merged
+    call fails or its JSON is truncated) falls back to its own request.
+    """
+    async def call_and_parse(prompt_text: str, out_tokens: int, bucket):
+        est_tokens = approx_tokens_from_chars(len(prompt_text)) + out_tokens
+        for attempt in range(OPENAI_RETRY_MAX_ATTEMPTS):
+            await bucket.acquire(1, est_tokens)
             try:
-                data = json.loads(raw_text)
-            except json.JSONDecodeError:
-                data = extract_first_json(raw_text)
+                response = await openai_call_func(api_key=api_key, model=model, prompt=prompt_text, max_output_tokens=out_tokens, temperature_zero=temperature_zero)
+                break
+            except Exception as e:
+                if attempt == OPENAI_RETRY_MAX_ATTEMPTS - 1 or not is_retryable(e):
+                    raise
+                await asyncio.sleep(min(2 ** attempt, OPENAI_RETRY_BACKOFF_CAP_SEC) + random.random() * 0.25)
+        if response.get("status") != "completed":
+            reason = (response.get("incomplete_details") or {}).get("reason", "unknown")
+            raise RuntimeError(f"API call failed: {reason}")
+        raw_text = extract_text_from_response(response).strip()
+        return parse_leading_json(raw_text)
+
+    async def exec_one(item: Dict[str, str], bucket) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        try:
+            data = await call_and_parse(prompt_builder_func(pdf_text, item), max_output_tokens, bucket)
             return item, {"success": True, "data": data}
         except Exception as e:
             return item, {"success": False, "error": str(e)}
 
+    async def exec_merged(bucket) -> Dict[str, Dict[str, Any]]:
+        """{prompt_type: data} for the tasks the merged answer covered; {} on failure."""
+        try:
+            prompt_text = multi_prompt_builder_func(pdf_text, prompt_items)
+            out_tokens = min(max_output_tokens * len(prompt_items), OPENAI_MAX_OUTPUT_TOKENS)
+            data = await call_and_parse(prompt_text, out_tokens, bucket)
+        except Exception:
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        # only requested keys holding a non-empty object count as answered
+        covered = {}
+        for it in prompt_items:
+            v = data.get(it["prompt_type"])
+            if isinstance(v, dict) and v:
+                covered[it["prompt_type"]] = v
+        return covered
+
+    async def exec_all():
+        bucket = bucket_for(api_key)
+        done = []
+        pending = prompt_items
+        if multi_prompt_builder_func is not None and len(prompt_items) > 1:
+            merged = await exec_merged(bucket)
+            done = [(it, {"success": True, "data": merged[it["prompt_type"]]}) for it in prompt_items if it["prompt_type"] in merged]
+            pending = [it for it in prompt_items if it["prompt_type"] not in merged]
+        # bound in-flight calls like the per-key cap (0 = unbounded)
+        cap = min(len(pending), OPENAI_MAX_CONCURRENCY_PER_KEY) if OPENAI_MAX_CONCURRENCY_PER_KEY > 0 else len(pending)
+        sem = asyncio.Semaphore(max(1, cap))
+
+        async def bounded(it):
+            async with sem:
+                return await exec_one(it, bucket)
+
+        rest = await asyncio.gather(*(bounded(it) for it in pending))
+        # keep prompt order so the merge below is deterministic
+        by_id = {id(it): res for it, res in (*done, *rest)}
+        return [(it, by_id[id(it)]) for it in prompt_items]
+
     results = {}
-    with ThreadPoolExecutor(max_workers=len(prompt_items)) as pool:
-        futs = {pool.submit(exec_one, it, i): it for i, it in enumerate(prompt_items)}
-        for fut in as_completed(futs):
-            item, res = fut.result()
-            results[item.get("prompt_type", f"idx_{len(results)}")] = res
+    for item, res in run_io(exec_all()):
+        results[item.get("prompt_type", f"idx_{len(results)}")] = res
 
     final_result = {}
     failed = []
@@ -1,18 +1,50 @@
 """
-PyPDF2 Text Extraction
+PDFium Text Extraction
 """
-from typing import List
+import ctypes
+import threading
+from typing import BinaryIO, List, Union
 
-def extract_pdf_text(file_content: bytes) -> str:
-    from PyPDF2 import PdfReader
-    import io
-    pdf_stream = io.BytesIO(file_content)
-    reader = PdfReader(pdf_stream)
+import pypdfium2 as pdfium
+
+# PDFium is not thread-safe (not even across separate documents), and jobs run on
+# a thread pool, so every PDFium call goes through this lock. Pages are therefore
+# read sequentially; the C parser is still several times faster than pure-Python.
+_PDFIUM_LOCK = threading.Lock()
+
+def _as_pdfium_input(file_content: Union[bytes, bytearray, memoryview, BinaryIO]):
+    """
+    Hand PDFium the caller's buffer without copying it. PDFium loads from bytes, a
+    ctypes array or a readable stream; other buffers are viewed as a ctypes array.
+    """
+    if isinstance(file_content, bytes):
+        return file_content
+    if isinstance(file_content, (bytearray, memoryview)):
+        mv = memoryview(file_content).cast("B")
+        if not mv.readonly and mv.contiguous:
+            return (ctypes.c_char * mv.nbytes).from_buffer(mv)
+        if isinstance(mv.obj, bytes) and mv.nbytes == len(mv.obj):
+            return mv.obj  # read-only view over a whole bytes object
+        return mv.tobytes()  # read-only partial view: the one case that copies
+    # Spooled upload from validate_file: PDFium reads the file object in place
+    file_content.seek(0)
+    return file_content
+
+def extract_pdf_text(file_content: Union[bytes, bytearray, memoryview, BinaryIO]) -> str:
+    file_content = _as_pdfium_input(file_content)
     parts: List[str] = []
-    for page in reader.pages:
-        text = page.extract_text() or ""
-        if text.strip():
-            parts.append(text)
+    with _PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(file_content)
+        try:
+            for page in pdf:
+                textpage = page.get_textpage()
+                text = textpage.get_text_bounded() or ""
+                textpage.close()
+                page.close()
+                if text.strip():
+                    parts.append(text)
+        finally:
+            pdf.close()
     full_text = "\n\n".join(parts).strip()
     if not full_text:
         raise RuntimeError("No extractable text found in PDF (it might be scanned images)")
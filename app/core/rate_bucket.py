@@ -0,0 +1,75 @@
+"""
+Async RPM/TPM Token Bucket for Batch Fan-Out
+"""
+import asyncio
+import time
+from collections import OrderedDict
+
+from app.config import OPENAI_RPM_PER_KEY, OPENAI_TPM_PER_KEY
+
+
+class AsyncRateBucket:
+    """
+    Two leaky buckets (requests/min and tokens/min) that start full and refill
+    continuously. acquire() returns as soon as both have capacity, so small
+    batches go out at once and large ones are paced at the account limit.
+
+    Single event loop only: the check-and-take in acquire() never awaits.
+    """
+
+    def __init__(self, rpm: int = OPENAI_RPM_PER_KEY, tpm: int = OPENAI_TPM_PER_KEY):
+        self.max_requests = float(rpm)
+        self.max_tokens = float(tpm)
+        self.available_request_capacity = self.max_requests
+        self.available_token_capacity = self.max_tokens
+        self._last = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed, self._last = now - self._last, now
+        self.available_request_capacity = min(
+            self.max_requests, self.available_request_capacity + elapsed * self.max_requests / 60.0
+        )
+        self.available_token_capacity = min(
+            self.max_tokens, self.available_token_capacity + elapsed * self.max_tokens / 60.0
+        )
+
+    async def acquire(self, requests: int = 1, tokens: int = 0) -> None:
+        # A single call larger than the whole TPM budget would never fit; let it
+        # through once the bucket is full rather than waiting forever.
+        tokens = min(tokens, self.max_tokens)
+        while True:
+            self._refill()
+            req_short = requests - self.available_request_capacity
+            tok_short = tokens - self.available_token_capacity
+            if req_short <= 0 and tok_short <= 0:
+                self.available_request_capacity -= requests
+                self.available_token_capacity -= tokens
+                return
+            wait = max(req_short * 60.0 / self.max_requests, tok_short * 60.0 / self.max_tokens)
+            await asyncio.sleep(max(wait, 0.001))
+
+
+# One bucket per key for the life of the process, so back-to-back batches are paced
+# against each other. A bucket idle for _IDLE_DROP_SEC has refilled completely, so
+# dropping it and starting the next batch with a new (full) one loses nothing.
+_IDLE_DROP_SEC = 60.0
+_buckets: "OrderedDict[str, AsyncRateBucket]" = OrderedDict()  # least recently handed out first
+
+def _drop_idle(now: float) -> None:
+    while _buckets:
+        key, bucket = next(iter(_buckets.items()))
+        if now - bucket._last < _IDLE_DROP_SEC:
+            _buckets.move_to_end(key)  # still draining; look again on a later call
+            return
+        del _buckets[key]
+
+def bucket_for(api_key: str) -> AsyncRateBucket:
+    """Get-or-create the bucket for api_key (call on the I/O loop)."""
+    _drop_idle(time.monotonic())
+    bucket = _buckets.get(api_key)
+    if bucket is None:
+        bucket = _buckets[api_key] = AsyncRateBucket()
+    else:
+        _buckets.move_to_end(api_key)
+    return bucket
@@ -0,0 +1,85 @@
+"""
+Content-Addressed PDF Text and Result Caches
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, BinaryIO, Hashable, Optional, Union
+
+from app.config import (
+    RESULT_CACHE_MAX_ENTRIES,
+    PDF_TEXT_CACHE_MAX_ENTRIES,
+    RESULT_CACHE_TTL_SEC,
+    UPLOAD_CHUNK_SIZE,
+)
+from app.core.pdf_processor import extract_pdf_text
+
+# Re-running a job on the same PDF (dev/retry flows) skips PDF parsing and, for
+# identical request parameters, the OpenAI call too. Per-process and in-memory.
+
+
+class _TTLCache:
+    """Small thread-safe LRU with a per-entry TTL."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            expires, value = hit
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self._maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self._ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+
+_pdf_texts = _TTLCache(PDF_TEXT_CACHE_MAX_ENTRIES, RESULT_CACHE_TTL_SEC)
+_results = _TTLCache(RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_TTL_SEC)
+
+
+def content_digest(file_content: Union[bytes, bytearray, memoryview, BinaryIO]) -> str:
+    """blake2b of the upload (stdlib, no extra dependency); streams file objects."""
+    h = hashlib.blake2b(digest_size=20)
+    if isinstance(file_content, (bytes, bytearray, memoryview)):
+        h.update(file_content)
+    else:
+        file_content.seek(0)
+        for chunk in iter(lambda: file_content.read(UPLOAD_CHUNK_SIZE), b""):
+            h.update(chunk)
+        file_content.seek(0)
+    return h.hexdigest()
+
+
+def cached_pdf_text(digest: str, file_content) -> str:
+    """extract_pdf_text, reused across jobs on the same file content."""
+    text = _pdf_texts.get(digest)
+    if text is None:
+        text = extract_pdf_text(file_content)
+        _pdf_texts.put(digest, text)
+    return text
+
+
+def get_result(key: Hashable) -> Optional[Any]:
+    return _results.get(key)
+
+
+def put_result(key: Hashable, result: Any) -> None:
+    """Only successful results are stored; callers must not mutate them afterwards."""
+    _results.put(key, result)
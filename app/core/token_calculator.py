@@ -11,7 +11,8 @@ ACTION_TOKEN_MULTIPLIER = EXTRACT_TOKEN_MULTIPLIER * 0.9   # nearly as generous
 ACTION_MAX_OUTPUT_TOKENS = 6144                            # higher cap to fit legit long results
 
 def approx_tokens_from_chars(n_chars: int) -> int:
-    return max(1, (n_chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+    # floor + 1: never below ceil(n / CHARS_PER_TOKEN), always >= 1, no max() branch
+    return n_chars // CHARS_PER_TOKEN + 1
 
 def calculate_max_output_tokens(input_tokens: int, operation: str, provided_tokens: int = None) -> int:
     """
@@ -39,5 +40,7 @@ def calculate_max_output_tokens(input_tokens: int, operation: str, provided_toke
     # Single clamp (micro-opt)
     return max(MIN_OUTPUT_TOKENS, int(t))
 
+# Not cached: model is a client-supplied form field, and two startswith checks
+# cost no more than a cache lookup
 def model_supports_temperature(model: str) -> bool:
     return model.startswith(("gpt-4.1", "gpt-4o"))
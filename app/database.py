@@ -1,31 +1,73 @@
 """
 SQLite Database Connection
 """
+import logging
 import sqlite3
 from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
+import queue
 import threading
 import time  # <-- added
 
-from app.config import DATABASE_URL, JOB_CLEANUP_MINUTES, DB_BUSY_TIMEOUT_MS, CLEANUP_INTERVAL_SECONDS
+from app.config import DATABASE_URL, JOB_CLEANUP_MINUTES, DB_BUSY_TIMEOUT_MS, DB_POOL_SIZE, CLEANUP_INTERVAL_SECONDS
+
+logger = logging.getLogger(__name__)
 
 _local = threading.local()
 
-def get_db_connection():
-    if not hasattr(_local, 'connection') or _local.connection is None:
-        _local.connection = sqlite3.connect(DATABASE_URL, check_same_thread=False)
-        _local.connection.row_factory = sqlite3.Row
-    return _local.connection
+# Bounded pool shared by request, job and writer threads (cleanup keeps its own
+# connection). Connections are tuned once at creation; a thread that nests
+# get_db() reuses the connection it already holds.
+_pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=DB_POOL_SIZE)
+_pool_lock = threading.Lock()
+_pool_created = 0
+
+def get_db_connection() -> sqlite3.Connection:
+    """Borrow a pooled connection; pair with _release_db_connection."""
+    global _pool_created
+    try:
+        return _pool.get_nowait()
+    except queue.Empty:
+        pass
+    with _pool_lock:
+        create = _pool_created < DB_POOL_SIZE
+        if create:
+            _pool_created += 1
+    if create:
+        try:
+            conn = sqlite3.connect(DATABASE_URL, check_same_thread=False, timeout=DB_BUSY_TIMEOUT_MS / 1000.0)
+            _tune_conn(conn)  # WAL: job polls read while handlers write
+            return conn
+        except Exception:
+            with _pool_lock:
+                _pool_created -= 1
+            raise
+    try:
+        return _pool.get(timeout=DB_BUSY_TIMEOUT_MS / 1000.0)
+    except queue.Empty:
+        raise sqlite3.OperationalError("database is busy: connection pool exhausted") from None
+
+def _release_db_connection(conn: sqlite3.Connection) -> None:
+    _pool.put_nowait(conn)
 
 @contextmanager
 def get_db():
-    conn = get_db_connection()
+    held = getattr(_local, "connection", None)
+    if held is not None:  # nested use on this thread
+        conn, owner = held, False
+    else:
+        conn, owner = get_db_connection(), True
+        _local.connection = conn
     try:
         yield conn
         conn.commit()
     except Exception:
         conn.rollback()
         raise
+    finally:
+        if owner:
+            _local.connection = None
+            _release_db_connection(conn)
 
 def init_database():
     with get_db() as conn:
@@ -56,16 +98,20 @@ def init_database():
                 last_reset TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
+        # cleanup_old_jobs range-scans this instead of reading the whole table
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at)")
 
 # ---------- added: dedicated connection for cleanup ----------
 
 def _tune_conn(conn: sqlite3.Connection):
-    """Apply pragmas that reduce contention and make cleanup safer."""
+    """Apply pragmas that reduce contention (used by request, job and cleanup connections)."""
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL;")
     conn.execute("PRAGMA synchronous=NORMAL;")
     conn.execute("PRAGMA foreign_keys=ON;")
     conn.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS};")
+    conn.execute("PRAGMA cache_size=-20000;")  # ~20MB page cache per connection (pool of DB_POOL_SIZE)
+    conn.execute("PRAGMA mmap_size=268435456;")  # 256MB memory-mapped reads of the jobs table
 
 @contextmanager
 def _cleanup_conn():
@@ -87,38 +133,39 @@ def _cleanup_conn():
 def cleanup_old_jobs():
     """
     Deletes old jobs in small batches using a dedicated connection.
-    Retries up to 5 times with 5s sleep on lock/busy. Keeps lock windows tiny.
-    Returns number of rows deleted in the last batch (0 if nothing to delete).
+    Each batch is one DELETE in its own short transaction; a batch is retried up
+    to 5 times with 5s sleep on lock/busy. Checkpoints the WAL once at the end.
+    Returns the total number of rows deleted.
     """
-    cutoff = int((datetime.now(timezone.utc) - timedelta(minutes=JOB_CLEANUP_MINUTES)).timestamp())
+    # created_at is CURRENT_TIMESTAMP text (UTC, 'YYYY-MM-DD HH:MM:SS'), which sorts
+    # chronologically, so a plain comparison can use idx_jobs_created_at.
+    cutoff = (datetime.now(timezone.utc) - timedelta(minutes=JOB_CLEANUP_MINUTES)).strftime("%Y-%m-%d %H:%M:%S")
     attempts = 5
     batch_size = 500
+    total = 0
 
-    for attempt in range(attempts):
-        try:
-            with _cleanup_conn() as conn:
-                conn.execute("BEGIN")
-                rows = conn.execute(
-                    "SELECT job_id FROM jobs WHERE strftime('%s', created_at) < ? LIMIT ?",
-                    (cutoff, batch_size),
-                ).fetchall()
-                if not rows:
-                    conn.commit()
-                    conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
-                    return 0
-
-                ids = [r[0] for r in rows]
-                placeholders = ",".join("?" * len(ids))
-                conn.execute(f"DELETE FROM jobs WHERE job_id IN ({placeholders})", ids)
-                conn.commit()
-                conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
-                return len(ids)
-        except sqlite3.OperationalError as e:
-            msg = str(e).lower()
-            if ("locked" in msg or "busy" in msg) and attempt < attempts - 1:
-                time.sleep(5)
-                continue
-            raise
+    with _cleanup_conn() as conn:
+        while True:
+            for attempt in range(attempts):
+                try:
+                    with conn:
+                        deleted = conn.execute(
+                            "DELETE FROM jobs WHERE rowid IN "
+                            "(SELECT rowid FROM jobs WHERE created_at < ? LIMIT ?)",
+                            (cutoff, batch_size),
+                        ).rowcount
+                    break
+                except sqlite3.OperationalError as e:
+                    msg = str(e).lower()
+                    if ("locked" in msg or "busy" in msg) and attempt < attempts - 1:
+                        time.sleep(5)
+                        continue
+                    raise
+            total += deleted
+            if deleted < batch_size:
+                break
+        conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    return total
 
 #  tiny scheduler you can call from FastAPI startup ----------
 
@@ -138,9 +185,9 @@ def start_cleanup_scheduler():
         while True:
             try:
                 deleted = cleanup_old_jobs()
-                print(f"[{datetime.now().isoformat()}] cleanup_old_jobs ran, deleted {deleted} rows")
-            except Exception as e:
-                print(f"[{datetime.now().isoformat()}] cleanup_old_jobs error: {e}")
+                logger.debug("cleanup_old_jobs ran, deleted %d rows", deleted)
+            except Exception:
+                logger.exception("cleanup_old_jobs error")
             time.sleep(CLEANUP_INTERVAL_SECONDS)
 
     t = threading.Thread(target=_loop, daemon=True)
@@ -1,17 +1,46 @@
+from tempfile import SpooledTemporaryFile
+
 from fastapi import HTTPException, status, UploadFile
-from app.config import MAX_FILE_SIZE
+from app.config import MAX_FILE_SIZE, UPLOAD_CHUNK_SIZE, UPLOAD_SPOOL_MAX_BYTES
+
+PDF_MAGIC = b"%PDF-"
+PDF_EOF = b"%%EOF"
+PDF_EOF_WINDOW = 1024  # readers look for %%EOF within the last 1KB
 
-async def validate_file(file: UploadFile) -> bytes:
+async def validate_file(file: UploadFile) -> SpooledTemporaryFile:
+    """
+    Stream the upload into a SpooledTemporaryFile (RAM up to UPLOAD_SPOOL_MAX_BYTES,
+    then disk) while enforcing MAX_FILE_SIZE, the PDF magic header and a %%EOF
+    marker in the last 1KB.
+    Returns the spool rewound to offset 0; the caller owns closing it.
+    """
     if not file or not file.filename:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No file provided")
 
-    content = await file.read()
-    if not content:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Empty file")
+    spool = SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAX_BYTES)
+    total = 0
+    tail = b""
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            if total == 0 and not chunk.startswith(PDF_MAGIC):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Not a PDF file")
+            total += len(chunk)
+            if total > MAX_FILE_SIZE:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"File too large. Maximum size is {MAX_FILE_SIZE} bytes"
+                )
+            spool.write(chunk)
+            tail = (tail + chunk[-PDF_EOF_WINDOW:])[-PDF_EOF_WINDOW:]
+
+        if total == 0:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Empty file")
+        if PDF_EOF not in tail:
+            # cut-off upload: reject before the job ever tries to parse it
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Truncated PDF")
+    except BaseException:
+        spool.close()
+        raise
 
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File too large. Maximum size is {MAX_FILE_SIZE} bytes"
-        )
-    return content
+    spool.seek(0)
+    return spool
@@ -3,12 +3,18 @@ FastAPI Application Entry Point
 """
 import logging
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 
 from app.database import init_database, start_cleanup_scheduler
 from app.api.routes import extract, classify, jobs, health, ai_action
 from app.utils.prl_cleaner import start_prl_cleanup_scheduler
+from app.utils.job_pool import drain_job_pool
+from app.utils.job_writer import start_job_writer, stop_job_writer
+from app.utils.upload_guard import UploadSizeLimitMiddleware
+from app.utils.rate_limiter import start_rate_limit_flusher, flush_rate_limits
+from app.core.openai_client import close_http_client
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,8 +23,13 @@ app = FastAPI(
     title="Resume Analyzer API",
     description="REST API for PDF resume analysis and document classification",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
+# Reject oversized multipart bodies before python-multipart parses them
+# (added first so CORS still wraps the 413 response)
+app.add_middleware(UploadSizeLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],            # tighten later if needed
@@ -29,11 +40,23 @@ app.add_middleware(
 
 @app.on_event("startup")
 async def on_startup():
+    app.state.job_futures = set()
     init_database()
+    start_job_writer(app)
     start_cleanup_scheduler()
+    start_rate_limit_flusher()
     start_prl_cleanup_scheduler()  # runs once immediately + hourly background loop
+    app.openapi()  # pre-warm: builds every model's JSON schema once, not on the first /docs hit
     logger.info("Database initialized and cleanup scheduler started")
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    await stop_job_writer(app)  # flush queued job rows (and start their jobs) first
+    await drain_job_pool(app)
+    close_http_client()  # after the drain: in-flight jobs may still be calling OpenAI
+    flush_rate_limits()
+    logger.info("Job pool shut down")
+
 # Routers
 app.include_router(ai_action.router, prefix="/ai", tags=["ai-actions"]) 
 app.include_router(extract.router, prefix="/extract", tags=["extraction"])
@@ -94,5 +117,7 @@ app.openapi = custom_openapi
 
 if __name__ == "__main__":
     import uvicorn
-    # Keep module path matching your imports (app.*) and bind to loopback for Caddy
-    uvicorn.run("app.main:app", host="127.0.0.1", port=8000, workers=2)
+    # Keep module path matching your imports (app.*) and bind to loopback for Caddy.
+    # Single worker: job/rate-limit counters are per process, and startup
+    # clears rows it cannot own if another worker is running.
+    uvicorn.run("app.main:app", host="127.0.0.1", port=8000, workers=1)
@@ -1,11 +1,11 @@
 """
 Pydantic Request Models
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 
 class PromptItem(BaseModel):
-    prompt_type: str
+    prompt_type: str = Field(pattern=r"\S")  # non-empty, not just whitespace
     prompt: Optional[str] = None
 
 class SingleExtractionRequest(BaseModel):
@@ -1,139 +1,342 @@
 # app/utils/debug_recorder.py
 from __future__ import annotations
-import json, os, shutil, traceback, uuid, datetime
+import io, os, re, string, traceback, uuid, datetime
 from pathlib import Path
-from typing import Any, Mapping, Sequence
+from functools import lru_cache
+from typing import Any, BinaryIO, Callable, Mapping, Sequence
+
+import orjson
+from pydantic import BaseModel
 
 # Import explicit config (no env lookups here)
 from app.config import (
     DEBUG_REQUEST_LOG_ENABLED,
     DEBUG_REQUEST_LOG_DIR,
     DEBUG_REQUEST_LOG_REDACT_KEYS,
+    DEBUG_REQUEST_LOG_SPLIT_FILES,
 )
+from app.utils.debug_recorder_writer import CallTask, CopyFdTask, WriteBytesTask, submit
 
 DEFAULT_REDACT_KEYS = {
     "authorization","cookie","set-cookie","openai_api_key","api_key",
     "password","token","bearer","secret"
 }
 
+# Fixed at import; lets module-level code skip recorder work without an instance
+RECORDING: bool = bool(DEBUG_REQUEST_LOG_ENABLED)
+
+_JSON_OPTS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+# events.jsonl: compact, newline emitted by orjson into the same bytes buffer
+_LINE_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+SIZE_SIDECAR = ".size"  # bytes recorded in a request folder, written on close()
+
+def write_in_background(fn, *args, **kwargs) -> None:
+    """Queue a best-effort debug write on the PRL writer thread; dropped if its queue is full."""
+    submit(CallTask(fn, args, kwargs))
+
+def _dumps(obj: Any) -> bytes:
+    """Pretty UTF-8 JSON (orjson: no ensure_ascii escaping, no str->bytes re-encode)."""
+    return orjson.dumps(obj, option=_JSON_OPTS)
+
 def _now_str() -> str:
     return datetime.datetime.utcnow().strftime("%Y%m%d_%H%M%S_%f")[:-3]
 
+# ASCII: one C-level translate; other text keeps Unicode letters/digits via regex
+_SAFE_TABLE = {i: ord("_") for i in range(128)}
+_SAFE_TABLE.update((ord(c), ord(c)) for c in string.ascii_letters + string.digits + "-_.")
+_UNSAFE_RE = re.compile(r"[^\w.-]")
+
 def _safe(s: str) -> str:
-    return "".join(c if c.isalnum() or c in ("-","_",".") else "_" for c in s)[:100]
-
-def _ensure_unique_path(p: Path) -> Path:
-    if not p.exists():
-        return p
-    stem, suffix, i = p.stem, p.suffix, 1
-    while True:
-        cand = p.with_name(f"{stem}({i}){suffix}")
-        if not cand.exists():
-            return cand
-        i += 1
-
-def _redacted(obj: Any, redact_keys: set[str]) -> Any:
-    if isinstance(obj, dict):
-        return {k: ("***REDACTED***" if str(k).lower() in redact_keys else _redacted(v, redact_keys))
-                for k, v in obj.items()}
-    if isinstance(obj, (list, tuple, set)):
-        t = type(obj)
-        return t(_redacted(x, redact_keys) for x in obj)
-    return obj
+    s = s[:100]  # 1:1 mapping, so truncating first is equivalent
+    return s.translate(_SAFE_TABLE) if s.isascii() else _UNSAFE_RE.sub("_", s)
+
+def _snapshot(data: Any) -> bytes | int:
+    """
+    Capture upload/stream contents without disk I/O on the calling thread:
+    the bytes of an in-memory spool, or a dup'd fd of one already on disk
+    (the writer reads it with pread, so the owner's offset and lifetime are
+    unaffected). Returns bytes or an fd the caller hands to the writer.
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return bytes(data)
+    inner = getattr(data, "_file", data)  # SpooledTemporaryFile wraps BytesIO or a real file
+    if hasattr(inner, "getvalue"):
+        return inner.getvalue()
+    try:
+        inner.flush()
+        return os.dup(inner.fileno())
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        data.seek(0)
+        raw = data.read()
+        data.seek(0)
+        return raw
+
+def _submit_snapshot(snap: bytes | int, dest: Path) -> int:
+    """Queue snap for writing at a free name based on dest; returns its size."""
+    if isinstance(snap, int):
+        size = os.fstat(snap).st_size
+        submit(CopyFdTask(snap, dest))
+        return size
+    submit(WriteBytesTask(dest, snap, unique=True))
+    return len(snap)
+
+_REDACTED = "***REDACTED***"
+_SCALARS = frozenset({str, int, float, bool, type(None), bytes})
+
+@lru_cache(maxsize=8)
+def _compile_redactor(redact_keys: frozenset[str]) -> Callable[[Any], Any]:
+    """
+    Build the redaction walk once per key set; recorders share the result.
+    Returns redact(obj): a single iterative pass (explicit stack, no recursion)
+    that copies containers only on the path to a redacted key. Untouched
+    subtrees are shared, and obj itself is returned when nothing matches.
+    Exact-type checks cover the plain JSON shapes; container subclasses fall
+    back to isinstance. Sets are left as they are (they cannot hold dicts).
+    """
+    _dict, _list, _tuple, _str = dict, list, tuple, str
+    _keys, _SENT, _scalars = redact_keys, _REDACTED, _SCALARS
+
+    def kind(o: Any, t: type) -> type | None:
+        if t is _dict or t is _list or t is _tuple:
+            return t
+        if t in _scalars:
+            return None
+        for base in (_dict, _list, _tuple):
+            if isinstance(o, base):
+                return base
+        return None
+
+    def rebuild(node: Any, k: type, changes: dict) -> Any:
+        if k is _dict:
+            out = _dict(node)
+            out.update(changes)
+            return out
+        out = _list(node)
+        for i, v in changes.items():
+            out[i] = v
+        return _tuple(out) if k is _tuple else out
+
+    def redact(obj: Any) -> Any:
+        k = kind(obj, type(obj))
+        if k is None:
+            return obj
+        # frame: [node, kind, child iterator, {key: replacement} or None, key in parent]
+        stack = [[obj, k, iter(obj.items()) if k is _dict else enumerate(obj), None, None]]
+        while True:
+            frame = stack[-1]
+            is_dict = frame[1] is _dict
+            for key, v in frame[2]:
+                if is_dict and (key.lower() if type(key) is _str else _str(key).lower()) in _keys:
+                    if frame[3] is None:
+                        frame[3] = {}
+                    frame[3][key] = _SENT
+                    continue
+                t = type(v)
+                if t in _scalars:
+                    continue
+                vk = kind(v, t)
+                if vk is not None:
+                    stack.append([v, vk, iter(v.items()) if vk is _dict else enumerate(v), None, key])
+                    break
+            else:
+                stack.pop()
+                node = frame[0]
+                done = rebuild(node, frame[1], frame[3]) if frame[3] else node
+                if not stack:
+                    return done
+                if done is not node:
+                    parent = stack[-1]
+                    if parent[3] is None:
+                        parent[3] = {}
+                    parent[3][frame[4]] = done
+
+    return redact
 
 def _parse_extra_redact_keys(cfg_value: str) -> set[str]:
     if not cfg_value:
         return set()
     return {k.strip().lower() for k in cfg_value.split(",") if k.strip()}
 
-class DebugRequestRecorder:
+# Built once: O(1) membership for the redaction walk, shared by every recorder
+_REDACT_KEYS: frozenset[str] = frozenset(DEFAULT_REDACT_KEYS | _parse_extra_redact_keys(DEBUG_REQUEST_LOG_REDACT_KEYS))
+
+class FileRequestRecorder:
     """
     Per-request folder capturing:
-      - request_meta.json
-      - request_body.json (optional)
+      - events.jsonl  one JSON line per record, kind = request_meta |
+                      request_body | response | exception
       - <field>__<original-filename>  # uploads written directly here
-      - response.json  (on success)
-      - exception.txt  (on error)
+
+    Nothing here touches the disk: the folder, uploads and artifacts are
+    written by the PRL writer thread (in submission order), and the records
+    are kept in memory and handed over as one events.jsonl append on close().
+    With DEBUG_REQUEST_LOG_SPLIT_FILES they are queued as separate files
+    instead (request_meta.json, request_body.json, response.json, exception.txt).
 
     Controlled *only* by app.config:
       DEBUG_REQUEST_LOG_ENABLED
       DEBUG_REQUEST_LOG_DIR
       DEBUG_REQUEST_LOG_REDACT_KEYS  (comma-separated; added to DEFAULT_REDACT_KEYS)
+      DEBUG_REQUEST_LOG_SPLIT_FILES
     """
     def __init__(self) -> None:
-        self.enabled: bool = bool(DEBUG_REQUEST_LOG_ENABLED)
+        self.enabled: bool = RECORDING
         self.root: Path = Path(DEBUG_REQUEST_LOG_DIR).resolve()
-        self.redact_keys: set[str] = DEFAULT_REDACT_KEYS | _parse_extra_redact_keys(DEBUG_REQUEST_LOG_REDACT_KEYS)
+        self.redact_keys: frozenset[str] = _REDACT_KEYS
+        self._redact = _compile_redactor(self.redact_keys)
         self.dir: Path | None = None
+        self.split_files: bool = bool(DEBUG_REQUEST_LOG_SPLIT_FILES)
+        self._lines: list[bytes] = []
+        self._bytes_written = 0
+        self._closed = False
+
+    def _record(self, kind: str, data: Any) -> None:
+        if self.split_files:
+            if kind == "exception":
+                raw = data.encode("utf-8")
+                submit(WriteBytesTask(self.dir / "exception.txt", raw))
+            else:
+                raw = _dumps(data)
+                submit(WriteBytesTask(self.dir / f"{kind}.json", raw))
+            self._bytes_written += len(raw)
+            return
+        line = orjson.dumps({"kind": kind, "data": data}, option=_LINE_OPTS)
+        self._bytes_written += len(line)
+        if self._closed:  # late record: append on its own
+            submit(WriteBytesTask(self.dir / "events.jsonl", line, append=True))
+        else:
+            self._lines.append(line)
+
+    def close(self) -> None:
+        """
+        Queue the buffered records as one events.jsonl append, then the folder's
+        .size sidecar (bytes recorded, read by prl_cleaner instead of walking
+        the folder). Only submits to the writer; safe to call more than once.
+        """
+        if self.dir is None or self._closed:
+            return
+        self._closed = True
+        lines, self._lines = self._lines, []
+        if lines:
+            submit(WriteBytesTask(self.dir / "events.jsonl", b"".join(lines), append=True))
+        # Read at run time: artifacts queued earlier on the same writer are counted
+        submit(CallTask(self._write_size))
+
+    def _write_size(self) -> None:
+        (self.dir / SIZE_SIDECAR).write_text(str(self._bytes_written), encoding="ascii")
 
     def start(self, route: str, method: str, headers: Mapping[str, str], query: Mapping[str, Any] | None = None) -> "DebugRequestRecorder":
         if not self.enabled:
             return self
         rid = f"{_now_str()}_{uuid.uuid4().hex[:8]}_{_safe(route.strip('/').replace('/','_') or 'root')}"
         self.dir = self.root / rid
-        self.dir.mkdir(parents=True, exist_ok=True)
+        # Queued first, so the writer creates the folder before anything lands in it
+        submit(CallTask(self.dir.mkdir, (), {"parents": True, "exist_ok": True}))
 
         meta = {
             "route": route,
             "method": method,
             "timestamp_utc": datetime.datetime.utcnow().isoformat(timespec="milliseconds") + "Z",
-            "headers": _redacted({k: headers.get(k) for k in headers}, self.redact_keys),
-            "query": _redacted(query or {}, self.redact_keys),
+            "headers": self._redact({k: headers.get(k) for k in headers}),
+            "query": self._redact(dict(query or {})),
         }
-        (self.dir / "request_meta.json").write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+        self._record("request_meta", meta)
         return self
 
     def save_request_json(self, body: Mapping[str, Any] | None) -> None:
         if not (self.enabled and self.dir) or body is None:
             return
-        (self.dir / "request_body.json").write_text(
-            json.dumps(_redacted(body, self.redact_keys), ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
+        self._record("request_body", self._redact(body))
 
     def save_uploads(self, uploads: Sequence[tuple[str, "UploadFileLike"]]) -> None:
         if not (self.enabled and self.dir) or not uploads:
             return
         for field, up in uploads:
             try:
-                up.file.seek(0)
                 fname = f"{_safe(field)}__{_safe(getattr(up, 'filename', 'upload.bin')) or 'upload.bin'}"
-                dest = _ensure_unique_path(self.dir / fname)
-                with open(dest, "wb") as out:
-                    shutil.copyfileobj(up.file, out)
-                up.file.seek(0)
+                # Snapshot now (the spool is closed with the request); the
+                # writer thread does the copy.
+                self._bytes_written += _submit_snapshot(_snapshot(up.file), self.dir / fname)
             except Exception as e:
                 err = self.dir / f"{_safe(field)}__WRITE_ERROR.txt"
-                err.write_text(str(e), encoding="utf-8")
+                submit(WriteBytesTask(err, str(e).encode("utf-8")))
 
     def save_response(self, status_code: int, payload: Any) -> None:
+        """payload may be a pydantic model; it is only dumped when recording is on."""
         if not (self.enabled and self.dir):
             return
-        out = {"status_code": status_code, "payload": _redacted(payload, self.redact_keys)}
-        (self.dir / "response.json").write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
+        if isinstance(payload, BaseModel):  # pydantic v2 is pinned; no .dict() fallback
+            payload = payload.model_dump()
+        self._record("response", {"status_code": status_code, "payload": self._redact(payload)})
 
     def save_exception(self, exc: BaseException) -> None:
         if not (self.enabled and self.dir):
             return
-        tb = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
-        (self.dir / "exception.txt").write_text(tb, encoding="utf-8")
+        self._record("exception", "".join(traceback.format_exception(type(exc), exc, exc.__traceback__)))
 
 
     def save_text(self, name: str, text: str) -> Path | None:
-        """Write UTF-8 text file into this request folder (unique filename)."""
+        """
+        Queue a UTF-8 text file for this request folder. Returns the requested
+        path; the writer adds a (n) suffix if that name is already taken.
+        """
         if not (self.enabled and self.dir):
             return None
-        safe = _safe(name or "artifact.txt")
-        dest = _ensure_unique_path(self.dir / safe)
-        dest.write_text(text if isinstance(text, str) else str(text), encoding="utf-8")
+        dest = self.dir / _safe(name or "artifact.txt")
+        raw = (text if isinstance(text, str) else str(text)).encode("utf-8")
+        submit(WriteBytesTask(dest, raw, unique=True))
+        self._bytes_written += len(raw)
         return dest
 
-    def save_bytes(self, name: str, data: bytes) -> Path | None:
-        """Write raw bytes file into this request folder (unique filename)."""
+    def save_bytes(self, name: str, data: bytes | BinaryIO) -> Path | None:
+        """Queue raw bytes (or a seekable binary stream, snapshotted now) like save_text."""
         if not (self.enabled and self.dir) or data is None:
             return None
-        safe = _safe(name or "artifact.bin")
-        dest = _ensure_unique_path(self.dir / safe)
-        with open(dest, "wb") as f:
-            f.write(data)
+        dest = self.dir / _safe(name or "artifact.bin")
+        self._bytes_written += _submit_snapshot(_snapshot(data), dest)
         return dest
+
+
+class NullRecorder:
+    """
+    Same surface as FileRequestRecorder, but every method is a no-op.
+    Used when DEBUG_REQUEST_LOG_ENABLED is False so the hot path never
+    touches the filesystem.
+    """
+    enabled: bool = False
+    dir: Path | None = None
+    _instance: "NullRecorder | None" = None
+
+    def __new__(cls) -> "NullRecorder":
+        # Stateless, so every DebugRequestRecorder() shares one instance
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def start(self, route: str, method: str, headers: Mapping[str, str], query: Mapping[str, Any] | None = None) -> "NullRecorder":
+        return self
+
+    def save_request_json(self, body: Mapping[str, Any] | None) -> None:
+        return None
+
+    def save_uploads(self, uploads: Sequence[tuple[str, "UploadFileLike"]]) -> None:
+        return None
+
+    def save_response(self, status_code: int, payload: Any) -> None:
+        return None
+
+    def save_exception(self, exc: BaseException) -> None:
+        return None
+
+    def save_text(self, name: str, text: str) -> Path | None:
+        return None
+
+    def save_bytes(self, name: str, data: bytes | BinaryIO) -> Path | None:
+        return None
+
+    def close(self) -> None:
+        return None
+
+
+# Chosen once at import from app.config; call sites keep using DebugRequestRecorder().
+DebugRequestRecorder = FileRequestRecorder if RECORDING else NullRecorder
@@ -0,0 +1,141 @@
+"""
+Background Writer for Per-Request Debug Logs
+"""
+import atexit
+import contextlib
+import logging
+import os
+import queue
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from app.config import DEBUG_REQUEST_LOG_QUEUE_MAX
+
+logger = logging.getLogger(__name__)
+
+_COPY_CHUNK = 1 << 20
+
+# One daemon thread drains a bounded queue of debug writes, so request and job
+# threads only enqueue. Fail-open: when the queue is full the record is dropped
+# and counted rather than making the caller wait on disk.
+
+
+@dataclass
+class WriteBytesTask:
+    path: Path
+    payload: bytes  # serialized by the caller, so later mutation can't leak in
+    append: bool = False
+    unique: bool = False  # pick a free name at write time instead of overwriting
+
+    def run(self) -> None:
+        path = _unique_path(self.path) if self.unique else self.path
+        with open(path, "ab" if self.append else "wb") as f:
+            f.write(self.payload)
+
+    def discard(self) -> None:
+        pass
+
+
+@dataclass
+class CopyFdTask:
+    fd: int  # dup of a file the caller keeps using; read with pread, offset untouched
+    dest: Path
+
+    def run(self) -> None:
+        with open(_unique_path(self.dest), "wb") as out:
+            offset = 0
+            while chunk := os.pread(self.fd, _COPY_CHUNK, offset):
+                out.write(chunk)
+                offset += len(chunk)
+        self.discard()
+
+    def discard(self) -> None:
+        fd, self.fd = self.fd, -1
+        if fd >= 0:
+            with contextlib.suppress(OSError):
+                os.close(fd)
+
+
+@dataclass
+class CallTask:
+    fn: Callable[..., Any]
+    args: tuple = ()
+    kwargs: dict = field(default_factory=dict)
+
+    def run(self) -> None:
+        self.fn(*self.args, **self.kwargs)
+
+    def discard(self) -> None:
+        pass
+
+
+def _unique_path(p: Path) -> Path:
+    if not p.exists():
+        return p
+    stem, suffix, i = p.stem, p.suffix, 1
+    while True:
+        cand = p.with_name(f"{stem}({i}){suffix}")
+        if not cand.exists():
+            return cand
+        i += 1
+
+
+_q: "queue.Queue" = queue.Queue(maxsize=DEBUG_REQUEST_LOG_QUEUE_MAX)
+_thread: Optional[threading.Thread] = None
+_start_lock = threading.Lock()
+dropped = 0  # records discarded because the queue was full
+
+
+def _loop() -> None:
+    while True:
+        task = _q.get()
+        if task is None:  # stop sentinel
+            return
+        try:
+            task.run()
+        except Exception:
+            logger.debug("debug log write failed", exc_info=True)
+            with contextlib.suppress(Exception):
+                task.discard()
+
+
+def _ensure_started() -> None:
+    global _thread
+    if _thread is None:
+        with _start_lock:
+            if _thread is None:
+                t = threading.Thread(target=_loop, name="prl-writer", daemon=True)
+                t.start()
+                _thread = t
+
+
+def submit(task) -> bool:
+    """Enqueue task for the writer thread; False (and task discarded) if the queue is full."""
+    global dropped
+    _ensure_started()
+    try:
+        _q.put_nowait(task)
+        return True
+    except queue.Full:
+        dropped += 1
+        task.discard()
+        if dropped == 1 or dropped % 100 == 0:
+            logger.warning("Debug log queue full; %d record(s) dropped so far", dropped)
+        return False
+
+
+def stop_writer(timeout: float = 5.0) -> None:
+    """Let queued writes finish (bounded by timeout) before the process exits."""
+    t = _thread
+    if t is None or not t.is_alive():
+        return
+    try:
+        _q.put(None, timeout=timeout)
+    except queue.Full:
+        return
+    t.join(timeout)
+
+
+atexit.register(stop_writer)
@@ -2,8 +2,14 @@
 Job Creation and Status Management
 """
 import json
+import logging
+from typing import Dict, Optional, Tuple
+
+import orjson
 from app.database import get_db
 
+logger = logging.getLogger(__name__)
+
 def create_job(job_id: str, user_id: str, api_key: str) -> bool:
     try:
         with get_db() as conn:
@@ -12,18 +18,56 @@ def create_job(job_id: str, user_id: str, api_key: str) -> bool:
     except Exception:
         return False
 
-def update_job_status(job_id: str, status: str, progress: int = None, result: dict = None, error_message: str = None):
+def create_jobs(rows) -> bool:
+    """Insert many (job_id, user_id, api_key) rows in one transaction."""
     try:
         with get_db() as conn:
-            if status in ("completed", "failed"):
-                if result is not None:
-                    conn.execute("UPDATE jobs SET status = ?, progress = ?, result = ?, completed_at = CURRENT_TIMESTAMP WHERE job_id = ?", (status, 100, json.dumps(result), job_id))
-                else:
-                    conn.execute("UPDATE jobs SET status = ?, progress = ?, error_message = ?, completed_at = CURRENT_TIMESTAMP WHERE job_id = ?", (status, 100, error_message, job_id))
-            else:
-                if progress is not None:
-                    conn.execute("UPDATE jobs SET status = ?, progress = ? WHERE job_id = ?", (status, progress, job_id))
-                else:
-                    conn.execute("UPDATE jobs SET status = ? WHERE job_id = ?", (status, job_id))
+            conn.executemany("INSERT OR IGNORE INTO jobs (job_id, user_id, openai_api_key, status, progress) VALUES (?, ?, ?, 'queued', 0)", rows)
+        return True
     except Exception:
-        pass
+        return False
+
+# Intermediate (non-terminal) status/progress of jobs running in this process.
+# Only terminal states are written to SQLite; /jobs overlays this map on the row.
+_progress_mem: Dict[str, Tuple[str, int]] = {}
+
+def live_job_progress(job_id: str) -> Optional[Tuple[str, int]]:
+    """(status, progress) of an in-flight job in this process, else None."""
+    return _progress_mem.get(job_id)
+
+# One statement for both terminal shapes, so it stays hot in the statement cache;
+# a NULL result / error_message leaves the stored column untouched.
+_FINISH_SQL = (
+    "UPDATE jobs SET status = ?, progress = 100, result = COALESCE(?, result), "
+    "error_message = COALESCE(?, error_message), completed_at = CURRENT_TIMESTAMP WHERE job_id = ?"
+)
+
+def _dump_result(result) -> str:
+    try:
+        return orjson.dumps(result).decode()
+    except TypeError:
+        # orjson rejects ints beyond 64 bits (raw_decode keeps them from model output);
+        # the stdlib encoder has no such limit
+        return json.dumps(result)
+
+def update_job_status(job_id: str, status: str, progress: int = None, result: dict = None, error_message: str = None):
+    if status not in ("completed", "failed"):
+        if progress is None:
+            prev = _progress_mem.get(job_id)
+            progress = prev[1] if prev else 0
+        _progress_mem[job_id] = (status, progress)
+        return
+    try:
+        raw = _dump_result(result) if result is not None else None
+        with get_db() as conn:
+            conn.execute(_FINISH_SQL, (status, raw, error_message, job_id))
+    except Exception as e:
+        # Never leave the row non-terminal: /jobs would report it queued forever
+        logger.exception("Failed to store terminal status %r for job %s", status, job_id)
+        try:
+            with get_db() as conn:
+                conn.execute(_FINISH_SQL, ("failed", None, f"Failed to store job result: {e}", job_id))
+        except Exception:
+            logger.exception("Failed to mark job %s as failed", job_id)
+    finally:
+        _progress_mem.pop(job_id, None)  # after the write, so a poll never falls back to 'queued'
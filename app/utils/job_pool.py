@@ -0,0 +1,53 @@
+"""
+Bounded Background Job Pool
+"""
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import AI_JOB_WORKERS, JOB_SHUTDOWN_DRAIN_SEC
+
+logger = logging.getLogger(__name__)
+
+# Shared by all job-creating routes. Jobs beyond AI_JOB_WORKERS queue inside the
+# executor instead of spawning a new OS thread per request.
+JOB_POOL = ThreadPoolExecutor(max_workers=AI_JOB_WORKERS, thread_name_prefix="ai-job")
+
+
+def _pending_jobs(app) -> set:
+    pending = getattr(app.state, "job_futures", None)
+    if pending is None:
+        pending = app.state.job_futures = set()
+    return pending
+
+
+def schedule_job(app, fn, *args) -> asyncio.Future:
+    """
+    Fire-and-forget fn(*args) on JOB_POOL via the running event loop.
+    The future is tracked on app.state.job_futures so shutdown can drain it.
+    """
+    loop = asyncio.get_running_loop()
+    fut = loop.run_in_executor(JOB_POOL, functools.partial(fn, *args))
+    pending = _pending_jobs(app)
+    pending.add(fut)
+
+    def _done(f: asyncio.Future) -> None:
+        pending.discard(f)
+        if not f.cancelled() and f.exception() is not None:
+            logger.error("Background job %s crashed", getattr(fn, "__name__", fn), exc_info=f.exception())
+
+    fut.add_done_callback(_done)
+    return fut
+
+
+async def drain_job_pool(app) -> None:
+    """
+    Wait up to JOB_SHUTDOWN_DRAIN_SEC for in-flight jobs, then stop the pool.
+    Jobs still running after the deadline finish in the background.
+    """
+    pending = _pending_jobs(app)
+    if pending:
+        logger.info("Draining %d background job(s)", len(pending))
+        await asyncio.wait(set(pending), timeout=JOB_SHUTDOWN_DRAIN_SEC)
+    JOB_POOL.shutdown(wait=False)
@@ -0,0 +1,38 @@
+"""
+Job Spawning Helper
+"""
+import os
+from typing import BinaryIO, Optional
+
+from app.utils.job_pool import schedule_job
+from app.utils.job_writer import enqueue_job
+
+
+def spawn_job(app, fn, request_data, upload: Optional[BinaryIO], *args) -> str:
+    """
+    Mint a job id, queue its 'queued' row for the batched writer and, once the
+    row is inserted, schedule fn(job_id, request_data, upload, *args) on the job pool.
+
+    The route owns job creation; /jobs reports rows still waiting in the writer
+    as queued, so an immediate GET /jobs/{id} never 404s.
+    The upload spool (if any) is closed once the job finishes, or straight away
+    if its row could not be inserted and the job is never started. Rate-limit
+    slots are taken by the job itself, so an unstarted job holds none.
+    """
+    job_id = os.urandom(16).hex()
+
+    def _abandon() -> None:
+        if upload is not None:
+            upload.close()
+
+    def _start() -> None:
+        try:
+            fut = schedule_job(app, fn, job_id, request_data, upload, *args)
+        except BaseException:
+            _abandon()
+            raise
+        if upload is not None:
+            fut.add_done_callback(lambda _f: upload.close())
+
+    enqueue_job(app, job_id, request_data.user_id, request_data.openai_api_key, _start, _abandon)
+    return job_id
@@ -0,0 +1,111 @@
+"""
+Batched Job-Row Writer
+"""
+import asyncio
+import logging
+import time
+
+from app.config import JOB_WRITE_QUEUE_MAX, JOB_WRITE_BATCH_MAX, JOB_WRITE_FLUSH_MS
+from app.utils.job_manager import create_job, create_jobs
+
+logger = logging.getLogger(__name__)
+
+# Routes enqueue (job_id, user_id, api_key, on_inserted, on_failed); a single
+# writer task gathers rows for JOB_WRITE_FLUSH_MS and inserts them with one
+# executemany. on_inserted runs on the event loop after the row exists, so a job
+# never starts (and never updates its status) before its row is visible. If a
+# row cannot be inserted at all, on_failed runs instead and the job never starts.
+
+
+def start_job_writer(app) -> None:
+    app.state.job_write_q = asyncio.Queue(maxsize=JOB_WRITE_QUEUE_MAX)
+    app.state.jobs_pending_insert = {}
+    app.state.job_write_task = asyncio.create_task(_writer_loop(app))
+
+
+def enqueue_job(app, job_id: str, user_id: str, api_key: str, on_inserted, on_failed) -> None:
+    """
+    Queue the 'queued' row for job_id. Falls back to a direct insert when the
+    writer is not running or its queue is full; that insert failing raises.
+    """
+    q = getattr(app.state, "job_write_q", None)
+    if q is not None:
+        try:
+            q.put_nowait((job_id, user_id, api_key, on_inserted, on_failed))
+            app.state.jobs_pending_insert[job_id] = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+            return
+        except asyncio.QueueFull:
+            logger.warning("Job write queue full; inserting %s directly", job_id)
+    if not create_job(job_id, user_id, api_key):
+        on_failed()
+        raise RuntimeError(f"Failed to insert job row {job_id}")
+    on_inserted()
+
+
+def pending_job_created_at(app, job_id: str):
+    """created_at of a job whose row is still queued for insert, else None."""
+    pending = getattr(app.state, "jobs_pending_insert", None)
+    return pending.get(job_id) if pending else None
+
+
+def _insert_one_by_one(batch) -> list:
+    """Per-row inserts after a failed batch; returns which rows made it."""
+    return [create_job(job_id, user_id, api_key) for job_id, user_id, api_key, _, _ in batch]
+
+
+async def _flush(app, batch) -> None:
+    rows = [item[:3] for item in batch]
+    loop = asyncio.get_running_loop()
+    if await loop.run_in_executor(None, create_jobs, rows):
+        inserted = [True] * len(batch)
+    else:
+        logger.error("Batched insert of %d job row(s) failed; retrying row by row", len(rows))
+        inserted = await loop.run_in_executor(None, _insert_one_by_one, batch)
+    pending = app.state.jobs_pending_insert
+    for (job_id, _, _, on_inserted, on_failed), ok in zip(batch, inserted):
+        pending.pop(job_id, None)
+        if not ok:
+            # No row: starting the job would 404 on /jobs and lose every status write
+            logger.error("Could not insert job %s; it will not be started", job_id)
+            try:
+                on_failed()
+            except Exception:
+                logger.exception("Failed to release job %s", job_id)
+            continue
+        try:
+            on_inserted()
+        except Exception:
+            logger.exception("Failed to start job %s", job_id)
+
+
+async def _writer_loop(app) -> None:
+    q = app.state.job_write_q
+    while True:
+        item = await q.get()
+        if item is None:  # stop sentinel
+            return
+        batch, stopping = [item], False
+        await asyncio.sleep(JOB_WRITE_FLUSH_MS / 1000.0)
+        while len(batch) < JOB_WRITE_BATCH_MAX:
+            try:
+                item = q.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if item is None:
+                stopping = True
+                break
+            batch.append(item)
+        await _flush(app, batch)
+        if stopping:
+            return
+
+
+async def stop_job_writer(app) -> None:
+    """Flush whatever is still queued, then stop the writer."""
+    task = getattr(app.state, "job_write_task", None)
+    if task is None:
+        return
+    q = app.state.job_write_q
+    app.state.job_write_q = None  # late submissions go straight to the DB
+    await q.put(None)
+    await task
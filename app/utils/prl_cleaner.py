@@ -1,11 +1,12 @@
 # app/utils/prl_cleaner.py
 from __future__ import annotations
-import os, shutil, threading, time
+import os, random, shutil, threading, time
 from pathlib import Path
-from typing import List
+from typing import List, Tuple
 import logging
 
 from app.config import DEBUG_REQUEST_LOG_DIR, DEBUG_REQUEST_LOG_ENABLED
+from app.utils.debug_recorder import SIZE_SIDECAR
 
 # Configurable caps (read from config.py)
 try:
@@ -20,53 +21,82 @@ except Exception:
 
 log = logging.getLogger(__name__)
 
-def _dir_size_bytes(p: Path) -> int:
+_EVICTION_SAMPLE = 32  # candidates examined per eviction
+
+def _dir_size_scandir(p: str) -> int:
+    """Bytes under p; DirEntry.stat() reuses the readdir data where the OS provides it."""
     total = 0
-    for root, _, files in os.walk(p):
-        for f in files:
-            try:
-                total += (Path(root) / f).stat().st_size
-            except Exception:
-                pass
+    stack = [p]
+    while stack:
+        d = stack.pop()
+        try:
+            with os.scandir(d) as it:
+                for e in it:
+                    try:
+                        if e.is_dir(follow_symlinks=False):
+                            stack.append(e.path)
+                        else:
+                            total += e.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        pass
+        except OSError:
+            pass
     return total
 
-def _list_request_dirs(root: Path) -> List[Path]:
-    if not root.exists():
-        return []
-    return [d for d in root.iterdir() if d.is_dir()]
-
-def _mtime(p: Path) -> float:
+def _recorded_size(path: str) -> int:
+    """Folder size from the recorder's .size sidecar, else a scandir walk."""
     try:
-        return p.stat().st_mtime
-    except Exception:
-        return 0.0
+        with open(os.path.join(path, SIZE_SIDECAR), "rb") as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return _dir_size_scandir(path)
+
+def _scan(base: Path) -> Tuple[int, List[Tuple[float, int, str]]]:
+    """
+    One pass over base: total bytes, plus (mtime, size, path) for each request dir.
+    Loose files count towards the total but are never deleted.
+    """
+    total = 0
+    dirs: List[Tuple[float, int, str]] = []
+    with os.scandir(base) as it:
+        for e in it:
+            try:
+                if e.is_dir(follow_symlinks=False):
+                    size = _recorded_size(e.path)
+                    dirs.append((e.stat(follow_symlinks=False).st_mtime, size, e.path))
+                else:
+                    size = e.stat(follow_symlinks=False).st_size
+            except OSError:
+                continue
+            total += size
+    return total, dirs
 
 def prune_once() -> int:
     """
-    Delete the oldest request directories first until total size of DEBUG_REQUEST_LOG_DIR
-    is <= PRL_MAX_BYTES. Returns number of deleted directories.
+    Delete request directories, approximately oldest first, until total size of
+    DEBUG_REQUEST_LOG_DIR is <= PRL_MAX_BYTES. Returns number of deleted directories.
+
+    Sizes come from each folder's .size sidecar (walked only when it is
+    missing), are read once up front and subtracted as directories go, so the
+    tree is walked a single time per run. Eviction is approximate LRU: the
+    oldest of _EVICTION_SAMPLE random directories goes first, instead of
+    sorting every directory.
     """
     base = Path(DEBUG_REQUEST_LOG_DIR).resolve()
     if not base.exists():
         return 0
 
-    def total_size():
-        return _dir_size_bytes(base)
-
+    total, dirs = _scan(base)
     deleted = 0
-    dirs = sorted(_list_request_dirs(base), key=_mtime, reverse=True)
-
-    if total_size() <= PRL_MAX_BYTES:
-        return 0
-
-    for d in reversed(dirs):  # start with oldest
-        try:
-            shutil.rmtree(d, ignore_errors=True)
-            deleted += 1
-            if total_size() <= PRL_MAX_BYTES:
-                break
-        except Exception:
-            pass
+    while total > PRL_MAX_BYTES and dirs:
+        sample = random.sample(range(len(dirs)), min(_EVICTION_SAMPLE, len(dirs)))
+        i = min(sample, key=lambda j: dirs[j][0])
+        _, size, path = dirs[i]
+        dirs[i] = dirs[-1]  # O(1) removal; order doesn't matter
+        dirs.pop()
+        shutil.rmtree(path, ignore_errors=True)
+        deleted += 1
+        total -= size
 
     return deleted
 
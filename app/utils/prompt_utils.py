@@ -1,8 +1,9 @@
 """
 Prompt File Loading and Template Processing
 """
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Tuple
 from app.config import PROMPTS_DIR
 
 PROMPT_TYPE_TO_FILE = {
@@ -15,6 +16,9 @@ PROMPT_TYPE_TO_FILE = {
     "skills": "extract_prompt_skills.txt",
 }
 
+# Templates are static files; read each once per process (restart to pick up edits).
+# Unknown/missing types raise, and exceptions are never cached.
+@lru_cache(maxsize=64)
 def load_prompt_template(prompt_type: str) -> str:
     if prompt_type not in PROMPT_TYPE_TO_FILE:
         raise ValueError(f"Unknown prompt type: {prompt_type}")
@@ -24,9 +28,41 @@ def load_prompt_template(prompt_type: str) -> str:
         raise FileNotFoundError(f"Prompt file not found: {prompt_file}")
     return prompt_file.read_text(encoding="utf-8")
 
+# File templates are split around {{PDF_TEXT}} once per prompt_type; a batch then
+# only joins the shared pdf_text into the pieces. (str.format is out: the templates
+# carry literal JSON braces.) Custom prompts are per-request, so they are not cached.
+@lru_cache(maxsize=64)
+def _template_parts(prompt_type: str) -> Tuple[str, ...]:
+    return tuple(load_prompt_template(prompt_type).split("{{PDF_TEXT}}"))
+
 def build_prompt(pdf_text: str, prompt_item: Dict[str, str]) -> str:
     if prompt_item.get("prompt"):
-        template = prompt_item["prompt"]
-    else:
-        template = load_prompt_template(prompt_item["prompt_type"])
-    return template.replace("{{PDF_TEXT}}", pdf_text)
+        return prompt_item["prompt"].replace("{{PDF_TEXT}}", pdf_text)
+    return pdf_text.join(_template_parts(prompt_item["prompt_type"]))
+
+def can_multiplex(prompt_items: List[Dict[str, str]]) -> bool:
+    """True when every item is a distinct, file-backed prompt_type (no custom prompt)."""
+    types = [it.get("prompt_type") for it in prompt_items]
+    return (
+        len(types) > 1
+        and len(set(types)) == len(types)
+        and all(not it.get("prompt") and it.get("prompt_type") in PROMPT_TYPE_TO_FILE for it in prompt_items)
+    )
+
+def build_multi_prompt(pdf_text: str, prompt_items: List[Dict[str, str]]) -> str:
+    """
+    One prompt covering several prompt_types over a single copy of the document.
+    The model answers with {prompt_type: <that task's JSON>, ...}.
+    """
+    keys = [it["prompt_type"] for it in prompt_items]
+    tasks = []
+    for key in keys:
+        instructions = "\n".join(p.strip() for p in _template_parts(key) if p.strip())
+        tasks.append(f'### TASK "{key}"\n{instructions}')
+    return (
+        f"You will perform {len(keys)} independent extraction tasks on the same document.\n"
+        f"Return ONE valid JSON object whose top-level keys are exactly: {', '.join(keys)}.\n"
+        "The value under each key is the JSON object that task asks for.\n\n"
+        + "\n\n".join(tasks)
+        + f"\n\n### DOCUMENT (shared by all tasks)\n{pdf_text}"
+    )
@@ -1,44 +1,100 @@
 """
 Simple Rate Limiting Logic
 """
+import logging
+import threading
+import time
+from typing import Dict, Set
+
 from app.database import get_db
-from app.config import MAX_JOBS_PER_API_KEY, MAX_JOBS_PER_USER
+from app.config import MAX_JOBS_PER_API_KEY, MAX_JOBS_PER_USER, RATE_LIMIT_FLUSH_SEC
+
+logger = logging.getLogger(__name__)
+
+# In-flight job counters live in process memory: check+increment and decrement are
+# dict ops under one lock instead of SQLite writes. Jobs run on this process's pool,
+# so the counts are exact per process. The rate_limit_* tables are refreshed from
+# them every RATE_LIMIT_FLUSH_SEC for visibility only; they are never read back.
+# Counters deliberately start at zero rather than being loaded from the tables:
+# rows left by a previous process describe jobs that no longer run, and with
+# several workers the tables hold whichever process flushed last.
+_lock = threading.Lock()
+_user_jobs: Dict[str, int] = {}
+_key_jobs: Dict[str, int] = {}
+_dirty_users: Set[str] = set()
+_dirty_keys: Set[str] = set()
 
 def check_and_increment_rate_limits(user_id: str, api_key: str):
+    with _lock:
+        user_jobs = _user_jobs.get(user_id, 0)
+        if user_jobs >= MAX_JOBS_PER_USER:
+            return False, f"user limit exceeded ({user_jobs}/{MAX_JOBS_PER_USER})"
+
+        key_jobs = _key_jobs.get(api_key, 0)
+        if key_jobs >= MAX_JOBS_PER_API_KEY:
+            return False, f"api_key limit exceeded ({key_jobs}/{MAX_JOBS_PER_API_KEY})"
+
+        _user_jobs[user_id] = user_jobs + 1
+        _key_jobs[api_key] = key_jobs + 1
+        _dirty_users.add(user_id)
+        _dirty_keys.add(api_key)
+    return True, None
+
+def _dec(counts: Dict[str, int], key: str) -> None:
+    n = counts.get(key, 0) - 1
+    if n > 0:
+        counts[key] = n
+    else:
+        counts.pop(key, None)  # idle keys don't accumulate
+
+def decrement_rate_limits(user_id: str, api_key: str):
+    with _lock:
+        _dec(_user_jobs, user_id)
+        _dec(_key_jobs, api_key)
+        _dirty_users.add(user_id)
+        _dirty_keys.add(api_key)
+
+def flush_rate_limits() -> None:
+    """Write counters changed since the last flush to the rate_limit_* tables."""
+    with _lock:
+        users = [(u, _user_jobs.get(u, 0)) for u in _dirty_users]
+        keys = [(k, _key_jobs.get(k, 0)) for k in _dirty_keys]
+        _dirty_users.clear()
+        _dirty_keys.clear()
+    if not users and not keys:
+        return
     try:
         with get_db() as conn:
-            row = conn.execute(
-                "SELECT current_jobs FROM rate_limit_users WHERE user_id = ?",
-                (user_id,)
-            ).fetchone()
-            user_jobs = row[0] if row else 0
-            if user_jobs >= MAX_JOBS_PER_USER:
-                return False, f"user limit exceeded ({user_jobs}/{MAX_JOBS_PER_USER})"
-
-            row = conn.execute(
-                "SELECT current_jobs FROM rate_limit_api_keys WHERE openai_api_key = ?",
-                (api_key,)
-            ).fetchone()
-            key_jobs = row[0] if row else 0
-            if key_jobs >= MAX_JOBS_PER_API_KEY:
-                return False, f"api_key limit exceeded ({key_jobs}/{MAX_JOBS_PER_API_KEY})"
-
-            conn.execute(
-                "INSERT OR REPLACE INTO rate_limit_users (user_id, current_jobs) VALUES (?, ?)",
-                (user_id, user_jobs + 1),
+            conn.executemany(
+                "INSERT OR REPLACE INTO rate_limit_users (user_id, current_jobs) VALUES (?, ?)", users
             )
-            conn.execute(
-                "INSERT OR REPLACE INTO rate_limit_api_keys (openai_api_key, current_jobs) VALUES (?, ?)",
-                (api_key, key_jobs + 1),
+            conn.executemany(
+                "INSERT OR REPLACE INTO rate_limit_api_keys (openai_api_key, current_jobs) VALUES (?, ?)", keys
             )
-            return True, None
-    except Exception as e:
-        return False, f"rate limiter error: {e}"
+    except Exception:
+        logger.exception("rate limit flush failed")
+        with _lock:  # retry these on the next flush
+            _dirty_users.update(u for u, _ in users)
+            _dirty_keys.update(k for k, _ in keys)
 
-def decrement_rate_limits(user_id: str, api_key: str):
+def _clear_stale_rows() -> None:
     try:
         with get_db() as conn:
-            conn.execute("UPDATE rate_limit_users SET current_jobs = MAX(0, current_jobs - 1) WHERE user_id = ?", (user_id,))
-            conn.execute("UPDATE rate_limit_api_keys SET current_jobs = MAX(0, current_jobs - 1) WHERE openai_api_key = ?", (api_key,))
+            conn.execute("DELETE FROM rate_limit_users")
+            conn.execute("DELETE FROM rate_limit_api_keys")
     except Exception:
-        pass
+        logger.exception("rate limit table reset failed")
+
+def start_rate_limit_flusher():
+    """
+    Drop rows left by a previous run, then start a background daemon thread
+    that calls flush_rate_limits every RATE_LIMIT_FLUSH_SEC.
+    """
+    _clear_stale_rows()
+    def _loop():
+        while True:
+            time.sleep(RATE_LIMIT_FLUSH_SEC)
+            flush_rate_limits()
+
+    t = threading.Thread(target=_loop, daemon=True)
+    t.start()
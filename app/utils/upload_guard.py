@@ -0,0 +1,41 @@
+"""
+Early rejection of oversized multipart uploads.
+"""
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import MAX_UPLOAD_BODY_BYTES
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Pure ASGI middleware: answers 413 for multipart requests whose declared
+    Content-Length exceeds MAX_UPLOAD_BODY_BYTES, before the form parser ever
+    touches the body. Chunked uploads (no Content-Length) fall through to the
+    streaming cap in validate_file.
+    """
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["method"] == "POST":
+            content_type = b""
+            content_length = None
+            for name, value in scope["headers"]:
+                if name == b"content-type":
+                    content_type = value
+                elif name == b"content-length":
+                    content_length = value
+            if content_length is not None and content_type.startswith(b"multipart/"):
+                try:
+                    too_large = int(content_length) > MAX_UPLOAD_BODY_BYTES
+                except ValueError:
+                    too_large = False
+                if too_large:
+                    response = JSONResponse(
+                        status_code=413,
+                        content={"detail": f"Request body too large. Maximum upload size is {MAX_UPLOAD_BODY_BYTES} bytes"},
+                    )
+                    await response(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
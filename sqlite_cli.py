@@ -21,11 +21,13 @@ Extras:
 
 import argparse
 import csv
+import itertools
 import os
 import re
 import sqlite3
 import sys
 from datetime import datetime, timezone
+from functools import lru_cache
 
 DEFAULT_DB = "resume_analyzer.db"
 
@@ -50,7 +52,12 @@ def _parse_ts(x):
             return None
     if not isinstance(x, str):
         return None
+    return _parse_ts_str(x)
 
+
+# Per-row SQL calls tend to repeat the same few timestamps; parse each once
+@lru_cache(maxsize=4096)
+def _parse_ts_str(x: str):
     s = x.strip()
     # Try ISO-like
     try:
@@ -63,6 +70,9 @@ def _parse_ts(x):
         return dt
     except Exception:
         pass
+    if len(s) >= 10 and s[4] == "-" and s[7] == "-":
+        # ISO-shaped: the strptime formats below are all ISO too, so they'd fail as well
+        return None
 
     # Common SQLite strftime storage formats
     for fmt in (
@@ -118,7 +128,12 @@ def sql_timediff_str(start, end):
 
 # ---------- output formatting ----------
 
-def _print_table(rows, headers, mode="table", show_headers=True, nullvalue="NULL"):
+def _print_table(rows, headers, mode="table", show_headers=True, nullvalue="NULL", max_peek=200):
+    """
+    Print rows (any iterable, e.g. a cursor) in a single pass. csv/tsv stream
+    straight through. table mode sizes its columns from the first max_peek
+    rows only; a longer value further down widens just its own line.
+    """
     if mode == "csv":
         w = csv.writer(sys.stdout)
         if show_headers:
@@ -133,30 +148,36 @@ def _print_table(rows, headers, mode="table", show_headers=True, nullvalue="NULL
             sys.stdout.write("\t".join(_to_tsv_cell(v, nullvalue) for v in r) + "\n")
         return
 
-    # table mode
-    cols = len(headers)
+    # table mode: every cell is formatted exactly once
+    fmts = [_make_fmt(nullvalue) for _ in headers]
+    rows = iter(rows)
+    cells = [[f(v) for f, v in zip(fmts, r)] for r in itertools.islice(rows, max_peek)]
     # compute widths
     widths = [len(h) if show_headers else 0 for h in headers]
-    for r in rows:
-        for i in range(cols):
-            cell = _display(v := r[i], nullvalue)
-            if len(cell) > widths[i]:
-                widths[i] = len(cell)
+    if cells:
+        widths = [max(w, max(map(len, col))) for w, col in zip(widths, zip(*cells))]
 
     def sep(char="-", cross="+"):
         return cross + cross.join(char * (w + 2) for w in widths) + cross
 
+    def emit(row_cells):
+        print("| " + " | ".join(c.ljust(w) for c, w in zip(row_cells, widths)) + " |")
+
     if show_headers:
         print(sep())
-        print("| " + " | ".join(h.ljust(widths[i]) for i, h in enumerate(headers)) + " |")
+        emit(headers)
     print(sep())
+    for row_cells in cells:
+        emit(row_cells)
     for r in rows:
-        line = "| " + " | ".join(_display(r[i], nullvalue).ljust(widths[i]) for i in range(cols)) + " |"
-        print(line)
+        emit([f(v) for f, v in zip(fmts, r)])
     print(sep())
 
-def _display(v, nullvalue):
-    return nullvalue if v is None else str(v)
+def _make_fmt(nullvalue, _str=str):
+    """Cell formatter with its NULL token and str() bound as locals."""
+    def fmt(v):
+        return nullvalue if v is None else _str(v)
+    return fmt
 
 def _coalesce(v, fallback):
     return fallback if v is None else v
@@ -184,6 +205,10 @@ Notes:
 - Registered SQL helpers:
     timediff_seconds(start, end) -> integer seconds (or NULL)
     timediff_str(start, end)     -> 'Xd Yh Zm Ws' string (or NULL)
+- These run in Python once per row. For large scans of text timestamps,
+  native SQL avoids that:
+    CAST(round((julianday(end) - julianday(start)) * 86400) AS INTEGER)
+  (epoch-second columns need julianday(col, 'unixepoch')).
 """
 
 def run_repl(conn: sqlite3.Connection):
@@ -203,8 +228,7 @@ def run_repl(conn: sqlite3.Connection):
                 print("(ok)")
                 return
             headers = [d[0] for d in cur.description]
-            rows = cur.fetchall()
-            _print_table([tuple(r) for r in rows], headers, mode=mode, show_headers=show_headers, nullvalue=nullvalue)
+            _print_table(cur, headers, mode=mode, show_headers=show_headers, nullvalue=nullvalue)
         except sqlite3.Error as e:
             print(f"[sqlite error] {e}")
 
@@ -276,43 +300,58 @@ def run_repl(conn: sqlite3.Connection):
             continue
 
         buf.append(line)
-        if any(";" in part for part in _split_sql_lines(line)):
-            # join, execute each statement separated by semicolon
-            sql_text = "\n".join(buf)
-            statements = [s.strip() for s in sql_text.split(";") if s.strip()]
-            for stmt in statements:
+        sql_text = "\n".join(buf)
+        # sqlite's own tokenizer decides completeness (quotes, comments, triggers)
+        if sqlite3.complete_statement(sql_text):
+            for stmt in _iter_statements(sql_text):
                 exec_and_print(stmt)
             buf = []  # reset buffer
 
-def _split_sql_lines(line: str):
-    # Simple splitter that respects quoted strings (single/double)
-    out = []
-    current = []
-    quote = None
-    it = iter(range(len(line)))
-    i = 0
-    while i < len(line):
-        ch = line[i]
-        current.append(ch)
-        if quote:
-            if ch == quote:
-                quote = None
-            elif ch == "\\":
-                # skip next char after escape in strings
-                nxt = i + 1
-                if nxt < len(line):
-                    current.append(line[nxt])
-                    i = nxt
-        else:
-            if ch in ("'", '"'):
-                quote = ch
-        i += 1
-    out.append("".join(current))
-    return out
+def _iter_statements(sql_text: str):
+    """
+    Yield the statements in sql_text. A ';' only ends a statement when
+    sqlite3.complete_statement agrees, so semicolons inside strings, comments
+    or CREATE TRIGGER bodies don't split it. A trailing statement without ';'
+    is yielded as is.
+    """
+    start = 0
+    idx = sql_text.find(";")
+    while idx != -1:
+        candidate = sql_text[start:idx + 1]
+        if sqlite3.complete_statement(candidate):
+            stmt = candidate.strip()
+            if stmt.rstrip(";").strip():
+                yield stmt
+            start = idx + 1
+        idx = sql_text.find(";", idx + 1)
+    tail = sql_text[start:].strip()
+    if tail:
+        yield tail
 
 # ---------- main ----------
 
-def connect_db(path: str, readonly: bool) -> sqlite3.Connection:
+_ROW_WORDS = {"SELECT", "WITH", "VALUES", "EXPLAIN"}
+_TXN_WORDS = {"BEGIN", "COMMIT", "END", "ROLLBACK", "SAVEPOINT", "RELEASE"}
+# Statements sqlite refuses inside a transaction
+_NO_TXN_WORDS = {"VACUUM", "ATTACH", "DETACH"}
+
+def _first_word(stmt: str) -> str:
+    m = re.match(r"\s*(?:--[^\n]*\n\s*|/\*.*?\*/\s*)*([A-Za-z]+)", stmt, re.S)
+    return m.group(1).upper() if m else ""
+
+def _returns_rows(stmt: str) -> bool:
+    """Heuristic: statements whose result set the CLI would print."""
+    word = _first_word(stmt)
+    return word in _ROW_WORDS or (word == "PRAGMA" and "=" not in stmt)
+
+def _skips_wrap(stmt: str) -> bool:
+    """True when stmt manages or cannot run in a transaction (incl. PRAGMA assignments)."""
+    word = _first_word(stmt)
+    return word in _TXN_WORDS or word in _NO_TXN_WORDS or (word == "PRAGMA" and "=" in stmt)
+
+DEFAULT_MMAP_BYTES = 268435456  # 256MB, same as the app's connections
+
+def connect_db(path: str, readonly: bool, mmap_bytes: int = DEFAULT_MMAP_BYTES) -> sqlite3.Connection:
     if readonly:
         uri = f"file:{path}?mode=ro"
         conn = sqlite3.connect(uri, uri=True, isolation_level=None)
@@ -320,9 +359,19 @@ def connect_db(path: str, readonly: bool) -> sqlite3.Connection:
         conn = sqlite3.connect(path)
     # Performance/behavioral pragmas (safe defaults)
     conn.execute("PRAGMA foreign_keys=ON;")
-    # Register helper functions
-    conn.create_function("timediff_seconds", 2, sql_timediff_seconds)
-    conn.create_function("timediff_str", 2, sql_timediff_str)
+    # Wait for the server's write lock instead of failing with "database is locked"
+    conn.execute("PRAGMA busy_timeout=5000;")
+    conn.execute(f"PRAGMA mmap_size={int(mmap_bytes)};")
+    if not readonly:
+        # Same journal settings as app/database.py: WAL lets the CLI and the
+        # server read and write side by side; NORMAL syncs at checkpoints only.
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute("PRAGMA temp_store=MEMORY;")
+    # Register helper functions (pure functions of their arguments, so deterministic:
+    # SQLite may factor repeated calls out and use them in indexes/generated columns)
+    conn.create_function("timediff_seconds", 2, sql_timediff_seconds, deterministic=True)
+    conn.create_function("timediff_str", 2, sql_timediff_str, deterministic=True)
     return conn
 
 def main():
@@ -335,6 +384,10 @@ def main():
     ap.add_argument("--mode", choices=["table", "csv", "tsv"], default="table", help="Output format (non-REPL)")
     ap.add_argument("--no-headers", action="store_true", help="Suppress header row (non-REPL)")
     ap.add_argument("--nullvalue", default="NULL", help="Token to show for NULLs")
+    ap.add_argument("--script", action="store_true",
+                    help="Run -e/-f SQL with executescript and print no result set")
+    ap.add_argument("--mmap", type=int, default=DEFAULT_MMAP_BYTES, metavar="BYTES",
+                    help=f"PRAGMA mmap_size for reads, 0 to disable (default: {DEFAULT_MMAP_BYTES})")
     args = ap.parse_args()
 
     # Determine mode
@@ -345,7 +398,7 @@ def main():
         sys.exit(2)
 
     try:
-        conn = connect_db(args.db, readonly=readonly)
+        conn = connect_db(args.db, readonly=readonly, mmap_bytes=args.mmap)
     except sqlite3.Error as e:
         sys.stderr.write(f"error: cannot open database: {e}\n")
         sys.exit(1)
@@ -355,18 +408,29 @@ def main():
             sql_text = args.execute or open(args.file, "r", encoding="utf-8").read()
             conn.row_factory = sqlite3.Row
             # Execute possibly multiple statements separated by ';'
-            statements = [s.strip() for s in sql_text.split(";") if s.strip()]
+            statements = list(_iter_statements(sql_text))
+            # Read-write runs get one transaction (one commit) unless the SQL manages its own
+            wrap = not readonly and not any(_skips_wrap(st) for st in statements)
+            if args.script or not any(_returns_rows(st) for st in statements):
+                # nothing to render: hand the whole text to sqlite in one call
+                conn.executescript(f"BEGIN;\n{sql_text}\n;\nCOMMIT;" if wrap else sql_text)
+                print("(ok)")
+                return
+            if wrap:
+                conn.execute("BEGIN")
             last_rows = None
             last_headers = None
-            for stmt in statements:
+            for n, stmt in enumerate(statements, 1):
                 cur = conn.execute(stmt)
                 if cur.description is not None:
                     last_headers = [d[0] for d in cur.description]
-                    last_rows = cur.fetchall()
+                    # the final statement's rows are streamed; earlier result sets
+                    # are read before the next statement runs
+                    last_rows = cur if n == len(statements) else cur.fetchall()
             # Print only the last result set (common CLI behavior)
             if last_headers is not None:
                 _print_table(
-                    [tuple(r) for r in last_rows],
+                    last_rows,
                     last_headers,
                     mode=args.mode,
                     show_headers=(not args.no_headers),
@@ -374,6 +438,8 @@ def main():
                 )
             else:
                 print("(ok)")
+            if wrap:
+                conn.commit()
         else:
             run_repl(conn)
     finally:
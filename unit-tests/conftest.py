@@ -1,12 +1,21 @@
+import functools
 import os
 import sys
 import types
+import importlib.abc
 import importlib.util
 import pytest
 from pathlib import Path
-from contextlib import contextmanager
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+
+# Repo root on sys.path, so tests importing app.* run from unit-tests/ (where pytest.ini is) too
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
 
 # ---------- Resolve ai_gateway.py ----------
+@functools.cache
 def _find_ai_gateway_path() -> str:
     p = os.environ.get("AI_GATEWAY_PATH")
     if p and Path(p).is_file():
@@ -22,9 +31,36 @@ def _find_ai_gateway_path() -> str:
     raise FileNotFoundError("Could not find ai_gateway.py. Set AI_GATEWAY_PATH or place it at repo root.")
 
 AI_GATEWAY_PATH = _find_ai_gateway_path()
+# Exported so xdist workers (which inherit the env) skip the candidate stat loop
+os.environ.setdefault("AI_GATEWAY_PATH", AI_GATEWAY_PATH)
+
+# ---------- Compiled gateway source + loaded-module memo ----------
+# reload_ai_gateway is called by nearly every test; read + compile the source once
+# (again only if the file changes) and reuse a loaded module for a repeated config.
+_CODE = None
+_CODE_MTIME_NS = None
+_MOD_CACHE: dict = {}
+
+def _gateway_code():
+    global _CODE, _CODE_MTIME_NS
+    mtime_ns = os.stat(AI_GATEWAY_PATH).st_mtime_ns
+    if _CODE is None or mtime_ns != _CODE_MTIME_NS:
+        _CODE = compile(Path(AI_GATEWAY_PATH).read_bytes(), AI_GATEWAY_PATH, "exec")
+        _CODE_MTIME_NS = mtime_ns
+        _MOD_CACHE.clear()
+    return _CODE
+
+def _reset_gateway_state(mod) -> None:
+    """Fresh per-key state on a reused module (monkeypatch already restored _limiter)."""
+    with mod._sem_lock:
+        mod._sems.clear()
+    mod._async_sems.clear()
+    mod._limiter = mod._StripedLimiter()
 
 # ---------- Package helpers ----------
 def _ensure_pkg(path: str) -> None:
+    if path in sys.modules:  # parents were created along with it
+        return
     parts = path.split(".")
     for i in range(1, len(parts) + 1):
         name = ".".join(parts[:i])
@@ -35,141 +71,228 @@ def _ensure_pkg(path: str) -> None:
             sys.modules[name] = mod
 
 def _purge_module(name: str) -> None:
-    for k in list(sys.modules.keys()):
-        if k == name or k.startswith(name + "."):
+    mod = sys.modules.pop(name, None)
+    # Only a package can have submodules; plain modules (app.config,
+    # app.core.ai_gateway) skip the scan over sys.modules entirely.
+    if mod is not None and hasattr(mod, "__path__"):
+        prefix = name + "."
+        for k in [k for k in sys.modules if k.startswith(prefix)]:
             sys.modules.pop(k, None)
 
-# ---------- Pre-inject pyrate_limiter shim (avoids ImportError on import) ----------
-def _ensure_pyrate_limiter_compat():
+# ---------- Lazy pyrate_limiter shim (built on first import, not at collection) ----------
+_PL_NAME = "pyrate_limiter"
+_PL_REQUIRED = ("Duration", "RequestRate", "Limiter", "MemoryListBucket", "BucketFullException")
+
+# Shim classes are defined once here; filling a stand-in module only attaches them.
+class _ShimBucketFullException(Exception):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*(args or ("bucket full",)))
+        # tests may set .meta_info externally
+
+class _ShimDuration:
+    SECOND = 1
+    MINUTE = 60
+    HOUR = 3600
+
+class _ShimRequestRate:
+    def __init__(self, num: int, interval: int):
+        self.num = num
+        self.interval = interval
+
+class _ShimMemoryListBucket:
+    pass
+
+class _ShimLimiter:
+    def __init__(self, rate, bucket_class=None, bucket_kwargs=None):
+        self.rate = rate
+        self.bucket_class = bucket_class
+        self.bucket_kwargs = bucket_kwargs or {}
+        self.calls = 0
+
+    def try_acquire(self, key, tokens: int = 1) -> bool:
+        self.calls += 1
+        return True  # tests monkeypatch _limiter
+
+    def ratelimit(self, key, delay=True):
+        return nullcontext()
+
+def _populate_pyrate_limiter_shim(pl) -> None:
     """
-    Inject a shim if 'pyrate_limiter' is missing or lacks:
+    Fill pl with a shim exposing:
     Duration, RequestRate, Limiter, MemoryListBucket, BucketFullException.
     Limiter exposes try_acquire() and a no-op ratelimit() CM.
     """
-    try:
-        import pyrate_limiter as _pl  # noqa
-        ok = all(hasattr(_pl, n) for n in
-                 ("Duration", "RequestRate", "Limiter", "MemoryListBucket", "BucketFullException"))
-        if ok:
-            return
-    except Exception:
-        pass
-
-    pl = types.ModuleType("pyrate_limiter")
-
-    class BucketFullException(Exception):
-        def __init__(self, *args, **kwargs):
-            super().__init__(*(args or ("bucket full",)))
-            # tests may set .meta_info externally
-
-    class Duration:
-        SECOND = 1
-        MINUTE = 60
-        HOUR = 3600
-
-    class RequestRate:
-        def __init__(self, num: int, interval: int):
-            self.num = num
-            self.interval = interval
-
-    class MemoryListBucket:
-        pass
-
-    class Limiter:
-        def __init__(self, rate, bucket_class=None, bucket_kwargs=None):
-            self.rate = rate
-            self.bucket_class = bucket_class
-            self.bucket_kwargs = bucket_kwargs or {}
-            self.calls = 0
-
-        def try_acquire(self, key, tokens: int = 1) -> bool:
-            self.calls += 1
-            return True  # tests monkeypatch _limiter
-
-        @contextmanager
-        def ratelimit(self, key, delay=True):
-            yield
-
-    pl.BucketFullException = BucketFullException
-    pl.Duration = Duration
-    pl.RequestRate = RequestRate
-    pl.MemoryListBucket = MemoryListBucket
-    pl.Limiter = Limiter
-
-    sys.modules["pyrate_limiter"] = pl
-
-# Ensure shim is present BEFORE tests import anything from pyrate_limiter
-_ensure_pyrate_limiter_compat()
+    pl.BucketFullException = _ShimBucketFullException
+    pl.Duration = _ShimDuration
+    pl.RequestRate = _ShimRequestRate
+    pl.MemoryListBucket = _ShimMemoryListBucket
+    pl.Limiter = _ShimLimiter
+
+def _pl_compatible(mod) -> bool:
+    return all(hasattr(mod, n) for n in _PL_REQUIRED)
+
+class _PLLoader(importlib.abc.Loader):
+    """Hands out the installed pyrate_limiter if it has the API the gateway uses, else the shim."""
+
+    def __init__(self, finder: "_PLFinder"):
+        self._finder = finder
+        self._real = None
+
+    def create_module(self, spec):
+        self._real = self._finder.import_real()
+        return self._real  # None -> default module, filled in exec_module
+
+    def exec_module(self, module) -> None:
+        if module is not self._real:
+            _populate_pyrate_limiter_shim(module)
+
+class _PLFinder(importlib.abc.MetaPathFinder):
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname != _PL_NAME:
+            return None
+        return importlib.util.spec_from_loader(fullname, _PLLoader(self))
+
+    def import_real(self):
+        """Import the installed package via the other finders; None if missing or incompatible."""
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(_PL_NAME, None)
+            if spec is not None:
+                break
+        else:
+            return None
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[_PL_NAME] = mod  # its submodules import through the parent
+        try:
+            spec.loader.exec_module(mod)
+            if _pl_compatible(mod):
+                return mod
+        except Exception:
+            pass
+        _purge_module(_PL_NAME)
+        return None
+
+def _install_pyrate_limiter_finder() -> None:
+    # Once per process (a conftest re-import must not stack finders)
+    if any(isinstance(f, _PLFinder) for f in sys.meta_path):
+        return
+    existing = sys.modules.get(_PL_NAME)
+    if existing is not None and not _pl_compatible(existing):
+        _purge_module(_PL_NAME)  # imported before us: the finder must see the next import
+    sys.meta_path.insert(0, _PLFinder())
+
+# Nothing is imported here; the shim is only built if a test imports pyrate_limiter
+_install_pyrate_limiter_finder()
 
 # ---------- Pytest fixtures ----------
+# One stand-in client module for the whole session; tests only swap its function.
+_FAKE_CLIENT = types.ModuleType("app.core.openai_client")
+
 @pytest.fixture
 def inject_fake_openai_client():
     def _inject(fn):
         _ensure_pkg("app")
         _ensure_pkg("app.core")
-        fake_mod = types.ModuleType("app.core.openai_client")
-        fake_mod.call_openai_api = fn
-        sys.modules["app.core.openai_client"] = fake_mod
-    return _inject
+        _FAKE_CLIENT.call_openai_api = fn
+        sys.modules["app.core.openai_client"] = _FAKE_CLIENT
+    yield _inject
+    _FAKE_CLIENT.__dict__.pop("call_openai_api", None)
+    if sys.modules.get("app.core.openai_client") is _FAKE_CLIENT:
+        del sys.modules["app.core.openai_client"]
+
+def _load_ai_gateway(with_config: bool,
+                     env_overrides: dict | None = None,
+                     config_values: dict | None = None,
+                     monkeypatch: pytest.MonkeyPatch | None = None):
+    code = _gateway_code()
+    env_overrides = env_overrides or {}
+    if env_overrides:
+        if monkeypatch is None:
+            raise ValueError("env_overrides need a monkeypatch to restore them")
+        for k, v in env_overrides.items():
+            monkeypatch.setenv(k, str(v))
+    cache_key = (
+        with_config,
+        frozenset(env_overrides.items()),
+        frozenset((config_values or {}).items()) if with_config else None,
+    )
+    cached = _MOD_CACHE.get(cache_key)
+    if cached is not None:
+        mod, cfg = cached
+        _reset_gateway_state(mod)
+        if cfg is not None:
+            sys.modules["app.config"] = cfg
+        else:
+            sys.modules.pop("app.config", None)
+        sys.modules["app.core.ai_gateway"] = mod
+        return mod
+
+    _purge_module("app.config")
+    _purge_module("app.core.ai_gateway")
+
+    cfg = None
+    if with_config:
+        _ensure_pkg("app")
+        cfg = types.ModuleType("app.config")
+        cv = config_values or {}
+        setattr(cfg, "OPENAI_RPM_PER_KEY", int(cv.get("OPENAI_RPM_PER_KEY", 480)))
+        setattr(cfg, "OPENAI_RPM_FAIL_FAST", bool(cv.get("OPENAI_RPM_FAIL_FAST", False)))
+        setattr(cfg, "OPENAI_MAX_CONCURRENCY_PER_KEY", int(cv.get("OPENAI_MAX_CONCURRENCY_PER_KEY", 20)))
+        setattr(cfg, "OPENAI_RPM_MAX_DELAY_MS", int(cv.get("OPENAI_RPM_MAX_DELAY_MS", 0)))
+        setattr(cfg, "OPENAI_REDIS_URL", str(cv.get("OPENAI_REDIS_URL", "")))
+        sys.modules["app.config"] = cfg
+    else:
+        if "app.config" in sys.modules:
+            del sys.modules["app.config"]
+
+    _ensure_pkg("app"); _ensure_pkg("app.core")
+    mod = types.ModuleType("app.core.ai_gateway")
+    mod.__file__ = AI_GATEWAY_PATH
+    mod.__package__ = "app.core"  # as a real import would set it
+    sys.modules["app.core.ai_gateway"] = mod
+    exec(code, mod.__dict__)
+    _MOD_CACHE[cache_key] = (mod, cfg)
+    return mod
 
 @pytest.fixture
-def reload_ai_gateway():
-    def _reload(with_config: bool,
-                env_overrides: dict | None = None,
-                config_values: dict | None = None):
-        _purge_module("app.config")
-        _purge_module("app.core.ai_gateway")
-
-        env_overrides = env_overrides or {}
-        old_env = {k: os.environ.get(k) for k in env_overrides}
-        try:
-            for k, v in env_overrides.items():
-                os.environ[k] = str(v)
-
-            if with_config:
-                _ensure_pkg("app")
-                cfg = types.ModuleType("app.config")
-                cv = config_values or {}
-                setattr(cfg, "OPENAI_RPM_PER_KEY", int(cv.get("OPENAI_RPM_PER_KEY", 480)))
-                setattr(cfg, "OPENAI_RPM_FAIL_FAST", bool(cv.get("OPENAI_RPM_FAIL_FAST", False)))
-                setattr(cfg, "OPENAI_MAX_CONCURRENCY_PER_KEY", int(cv.get("OPENAI_MAX_CONCURRENCY_PER_KEY", 20)))
-                setattr(cfg, "OPENAI_RPM_MAX_DELAY_MS", int(cv.get("OPENAI_RPM_MAX_DELAY_MS", 0)))
-                setattr(cfg, "OPENAI_REDIS_URL", str(cv.get("OPENAI_REDIS_URL", "")))
-                sys.modules["app.config"] = cfg
-            else:
-                if "app.config" in sys.modules:
-                    del sys.modules["app.config"]
-
-            _ensure_pkg("app"); _ensure_pkg("app.core")
-            spec = importlib.util.spec_from_file_location("app.core.ai_gateway", AI_GATEWAY_PATH)
-            if spec is None or spec.loader is None:
-                raise ImportError(f"Could not load spec for {AI_GATEWAY_PATH}")
-            mod = importlib.util.module_from_spec(spec)
-            sys.modules["app.core.ai_gateway"] = mod
-            spec.loader.exec_module(mod)  # type: ignore[arg-type]
-            return mod
-        finally:
-            for k, v in old_env.items():
-                if v is None:
-                    os.environ.pop(k, None)
-                else:
-                    os.environ[k] = v
-    return _reload
-
-@pytest.fixture(autouse=True)
-def _clear_ai_gateway_semaphores():
-    try:
-        import app.core.ai_gateway as mod
-        if hasattr(mod, "_sem_lock") and hasattr(mod, "_sems"):
-            with mod._sem_lock:
-                mod._sems.clear()
-    except Exception:
-        pass
-    yield
-    try:
-        import app.core.ai_gateway as mod
-        if hasattr(mod, "_sem_lock") and hasattr(mod, "_sems"):
-            with mod._sem_lock:
-                mod._sems.clear()
-    except Exception:
-        pass
+def reload_ai_gateway(monkeypatch):
+    # env_overrides go through monkeypatch.setenv and are undone after the test
+    return functools.partial(_load_ai_gateway, monkeypatch=monkeypatch)
+
+# Knobs the gateway reads at call time (module globals), so a test can set them on
+# one shared module instead of re-loading it per parametrize case. Tests that
+# exercise import-time setup (env fallbacks) keep using reload_ai_gateway.
+_CALL_TIME_KNOBS = ("OPENAI_RPM_PER_KEY", "OPENAI_RPM_FAIL_FAST", "OPENAI_MAX_CONCURRENCY_PER_KEY")
+
+@pytest.fixture(scope="module")
+def _shared_gateway():
+    return _load_ai_gateway(with_config=True)
+
+@pytest.fixture
+def gateway_mod(_shared_gateway, monkeypatch):
+    """The module-wide gateway, with fresh per-key state for this test."""
+    _reset_gateway_state(_shared_gateway)
+    monkeypatch.setitem(sys.modules, "app.core.ai_gateway", _shared_gateway)
+    return _shared_gateway
+
+@pytest.fixture
+def configure_gateway(gateway_mod, monkeypatch):
+    """
+    configure_gateway(OPENAI_RPM_PER_KEY=..., ...) sets call-time knobs on the
+    shared gateway and returns it; monkeypatch puts them back after the test.
+    """
+    def _configure(**knobs):
+        for name, value in knobs.items():
+            if name not in _CALL_TIME_KNOBS:
+                raise KeyError(f"{name} is read at import time; use reload_ai_gateway")
+            monkeypatch.setattr(gateway_mod, name, value, raising=True)
+        _reset_gateway_state(gateway_mod)  # semaphores are sized from the cap
+        return gateway_mod
+    return _configure
+
+@pytest.fixture(scope="module")
+def tpool():
+    """Worker threads shared by the concurrency tests in a module (sized above the largest N)."""
+    with ThreadPoolExecutor(max_workers=64, thread_name_prefix="test-worker") as ex:
+        yield ex
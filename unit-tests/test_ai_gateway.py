@@ -1,46 +1,79 @@
-import time
-import threading
+import logging
 import pytest
-from contextlib import contextmanager
-import math
+from contextlib import nullcontext
+
+# Diagnostics are DEBUG records: silent by default, shown with --log-cli-level=DEBUG
+log = logging.getLogger(__name__)
 
 # --------------------------- Fake limiter factory -----------------------------
 
-def make_fake_limiter(mod, mode="ok", reset_in=1.4):
-    def _bucket_full_exc(reset_in_val: float):
-        cls = mod.BucketFullException
-        exc = cls.__new__(cls)
-        Exception.__init__(exc, "bucket full")
-        setattr(exc, "meta_info", {
-            "reset_in": float(reset_in_val),
-            "rate": f"{mod.OPENAI_RPM_PER_KEY}/minute",
-        })
-        return exc
-
-    class FakeLimiter:
-        def __init__(self):
-            self.mode = mode
-            self.reset_in = float(reset_in)
-            self.last_key = None
-            self.calls = 0
-
-        def try_acquire(self, key, tokens=1):
-            self.last_key = key
-            self.calls += 1
-            if self.mode == "ok":
-                return True
-            raise _bucket_full_exc(self.reset_in)
-
-        @contextmanager
-        def ratelimit(self, key, delay=True):
-            self.last_key = key
-            self.calls += 1
-            if self.mode == "ok":
-                yield
-            else:
-                raise _bucket_full_exc(self.reset_in)
-
-    return FakeLimiter()
+# ratelimit() hands back a ready-made context manager rather than a generator:
+# a shared no-op when the call passes, one that raises on __enter__ when full.
+_PASS = nullcontext()
+
+class _RaisingCM:
+    __slots__ = ("exc",)
+
+    def __init__(self, exc):
+        self.exc = exc
+
+    def __enter__(self):
+        raise self.exc
+
+    def __exit__(self, *exc_info):
+        return False
+
+class _FakeLimiter:
+    """
+    Stand-in for the gateway's limiter. Every call passes by default;
+    always_fail rejects every call, passes_until lets that many calls through
+    and rejects the rest, and wrap_real hands passing ratelimit() calls on to
+    the real limiter.
+    """
+    __slots__ = ("always_fail", "passes_until", "wrap_real", "last_key", "calls", "_prebuilt_exc", "_full")
+
+    def __init__(self, exc, always_fail, passes_until, wrap_real):
+        self.always_fail = always_fail
+        self.passes_until = passes_until
+        self.wrap_real = wrap_real
+        self.last_key = None
+        self.calls = 0
+        # Built once and re-raised on every rejected call
+        self._prebuilt_exc = exc
+        self._full = _RaisingCM(exc)
+
+    def _passes(self):
+        if self.always_fail:
+            return False
+        return self.passes_until is None or self.calls <= self.passes_until
+
+    def try_acquire(self, key, tokens=1):
+        self.last_key = key
+        self.calls += 1
+        if self._passes():
+            return True
+        raise self._prebuilt_exc
+
+    def ratelimit(self, key, delay=True):
+        self.last_key = key
+        self.calls += 1
+        if not self._passes():
+            return self._full
+        if self.wrap_real is not None:
+            return self.wrap_real.ratelimit(key, delay=delay)
+        return _PASS
+
+def make_limiter(mod, *, passes_until=None, always_fail=False, wrap_real=None, reset_in=1.4):
+    # BucketFullException with meta_info like the real lib; the rate is read
+    # from the gateway, so configure it before building the limiter.
+    cls = mod.BucketFullException
+    exc = cls.__new__(cls)
+    Exception.__init__(exc, "bucket full")
+    setattr(exc, "meta_info", {
+        "reset_in": float(reset_in),
+        "rate": f"{mod.OPENAI_RPM_PER_KEY}/minute",
+    })
+    return _FakeLimiter(exc, always_fail, passes_until, wrap_real)
 
 # ------------------------------- Tests ----------------------------------------
 
@@ -51,7 +84,7 @@ def test_calls_openai_api_under_limits(monkeypatch, reload_ai_gateway, inject_fa
         "OPENAI_RPM_FAIL_FAST": False,
         "OPENAI_RPM_MAX_DELAY_MS": 1000,
     })
-    fake = make_fake_limiter(mod, mode="ok")
+    fake = make_limiter(mod)
     monkeypatch.setattr(mod, "_limiter", fake, raising=True)
 
     captured = {}
@@ -62,60 +95,46 @@ def test_calls_openai_api_under_limits(monkeypatch, reload_ai_gateway, inject_fa
 
     out = mod.call_openai_rate_limited("k-123", "gpt-x", "hello", 42, True)
 
-    print(f"[INFO] call_openai_api_under_limits -> api_key={captured['api_key']}, "
-          f"model={captured['model']}, limiter_calls={fake.calls}")
+    log.debug("call_openai_api_under_limits -> api_key=%s, model=%s, limiter_calls=%s",
+              captured["api_key"], captured["model"], fake.calls)
 
     assert out["status"] == "ok"
     assert fake.calls >= 1
 
+def _retry_after(reset_in):
+    """Retry-After the gateway should send for a limiter reset_in (whole seconds, rounded up)."""
+    import math
+    return str(int(math.ceil(reset_in)))
+
 @pytest.mark.parametrize(
-    "rpm, reset_in, expect_trigger",
+    "rpm, reset_in, expect_trigger, expected_retry_after",
     [
-        (100, 1.2, False),  # RPM-1 (well below 480): should NOT trigger
-        (480, 0.5, True),   # RPM (at default limit): should trigger
-        (500, 2.0, True),   # RPM+1 (above default): should trigger
+        pytest.param(*case, _retry_after(case[1]))
+        for case in (
+            (100, 1.2, False),  # RPM-1 (well below 480): should NOT trigger
+            (480, 0.5, True),   # RPM (at default limit): should trigger
+            (500, 2.0, True),   # RPM+1 (above default): should trigger
+        )
     ],
 )
-def test_rpm_fail_fast_matrix(monkeypatch, reload_ai_gateway, inject_fake_openai_client, rpm, reset_in, expect_trigger):
+def test_rpm_fail_fast_matrix(monkeypatch, configure_gateway, inject_fake_openai_client,
+                              rpm, reset_in, expect_trigger, expected_retry_after):
     """
     Matrix test for RPM fail-fast behavior against default production limit (480).
     - When expect_trigger is False, limiter yields and no 429 is raised.
     - When expect_trigger is True, limiter raises BucketFullException and gateway returns 429 with proper Retry-After.
     """
     # Configure gateway (fail-fast = True to exercise 429 path when triggered)
-    mod = reload_ai_gateway(with_config=True, config_values={
-        "OPENAI_RPM_PER_KEY": rpm,
-        "OPENAI_RPM_FAIL_FAST": True,
-        "OPENAI_MAX_CONCURRENCY_PER_KEY": 0,
-    })
+    mod = configure_gateway(
+        OPENAI_RPM_PER_KEY=rpm,
+        OPENAI_RPM_FAIL_FAST=True,
+        OPENAI_MAX_CONCURRENCY_PER_KEY=0,
+    )
 
     # Conditional fake limiter:
     # - If expect_trigger: ratelimit(delay=False) raises with .meta_info.reset_in
-    # - Else: it yields normally (no limit hit)
-    def _bucket_full_exc(reset_in_val: float):
-        cls = mod.BucketFullException
-        exc = cls.__new__(cls)
-        Exception.__init__(exc, "bucket full")
-        setattr(exc, "meta_info", {"reset_in": float(reset_in_val), "rate": f"{rpm}/minute"})
-        return exc
-
-    class _ConditionalLimiter:
-        def __init__(self): self.calls = 0
-        def try_acquire(self, key, tokens=1):
-            # Gateway uses ratelimit(); keep try_acquire harmless
-            self.calls += 1
-            if expect_trigger:
-                raise _bucket_full_exc(reset_in)
-            return True
-        @contextmanager
-        def ratelimit(self, key, delay=True):
-            self.calls += 1
-            if expect_trigger:
-                # fail-fast path sets delay=False in gateway logic
-                raise _bucket_full_exc(reset_in)
-            yield
-
-    fake = _ConditionalLimiter()
+    # - Else: it passes normally (no limit hit)
+    fake = make_limiter(mod, always_fail=expect_trigger, reset_in=reset_in)
     monkeypatch.setattr(mod, "_limiter", fake, raising=True)
 
     if expect_trigger:
@@ -124,17 +143,17 @@ def test_rpm_fail_fast_matrix(monkeypatch, reload_ai_gateway, inject_fake_openai
         with pytest.raises(mod.OpenAIRateLimitError) as ei:
             mod.call_openai_rate_limited("key-x", "model-y", "prompt", None, False)
         err = ei.value
-        expected_retry_after = str(int(math.ceil(reset_in)))
         assert err.status_code == 429
         assert err.headers.get("Retry-After") == expected_retry_after
         assert f"{rpm}/minute" in err.detail
-        print(f"[INFO] RPM={rpm} TRIGGERED ✔ reset_in={reset_in} -> Retry-After={expected_retry_after}; limiter_calls={fake.calls}")
+        log.debug("RPM=%s TRIGGERED reset_in=%s -> Retry-After=%s; limiter_calls=%s",
+                  rpm, reset_in, expected_retry_after, fake.calls)
     else:
         # when not triggered, the client is called and returns ok
         inject_fake_openai_client(lambda *a, **k: {"status": "ok"})
         out = mod.call_openai_rate_limited("key-x", "model-y", "prompt", 64, True)
         assert out["status"] == "ok"
-        print(f"[INFO] RPM={rpm} NOT TRIGGERED ✔ limiter_calls={fake.calls}")
+        log.debug("RPM=%s NOT TRIGGERED limiter_calls=%s", rpm, fake.calls)
 
 
 def test_blocking_mode_does_not_raise(monkeypatch, reload_ai_gateway, inject_fake_openai_client):
@@ -143,56 +162,58 @@ def test_blocking_mode_does_not_raise(monkeypatch, reload_ai_gateway, inject_fak
         "OPENAI_RPM_FAIL_FAST": False,
         "OPENAI_MAX_CONCURRENCY_PER_KEY": 0,
     })
-    fake = make_fake_limiter(mod, mode="ok")
+    fake = make_limiter(mod)
     monkeypatch.setattr(mod, "_limiter", fake, raising=True)
 
     inject_fake_openai_client(lambda *a, **k: {"status": "ok"})
     out = mod.call_openai_rate_limited("k", "m", "p", 10, True)
 
-    print(f"[INFO] blocking_mode_does_not_raise -> result={out}, limiter_calls={fake.calls}")
+    log.debug("blocking_mode_does_not_raise -> result=%s, limiter_calls=%s", out, fake.calls)
 
     assert out["status"] == "ok"
 
 
-def test_concurrency_limits_block(monkeypatch, reload_ai_gateway, inject_fake_openai_client):
+def test_concurrency_limits_block(monkeypatch, reload_ai_gateway, inject_fake_openai_client, tpool):
+    import threading
     mod = reload_ai_gateway(with_config=True, config_values={
         "OPENAI_MAX_CONCURRENCY_PER_KEY": 1,
         "OPENAI_RPM_PER_KEY": 10_000,
         "OPENAI_RPM_FAIL_FAST": False,
     })
 
-    class _OKLimiter:
-        def __init__(self): self.calls = 0
-        def try_acquire(self, key, tokens=1):
-            self.calls += 1
-            return True
-        @contextmanager
-        def ratelimit(self, key, delay=True):
-            self.calls += 1
-            yield
-
-    ok = _OKLimiter()
+    ok = make_limiter(mod)
     monkeypatch.setattr(mod, "_limiter", ok, raising=True)
 
-    def slow_call(*a, **k):
-        time.sleep(0.35)
+    # First call parks inside the client until released; the second must wait
+    # on the per-key semaphore (cap=1) and not reach the client meanwhile.
+    entered = [threading.Event(), threading.Event()]
+    release = threading.Event()
+    order = iter(range(2))
+    order_lock = threading.Lock()
+
+    def parked_call(*a, **k):
+        with order_lock:
+            i = next(order)
+        entered[i].set()
+        if i == 0:
+            release.wait(2.0)
         return {"status": "ok"}
-    inject_fake_openai_client(slow_call)
+    inject_fake_openai_client(parked_call)
 
-    results = []
     def worker():
-        results.append(mod.call_openai_rate_limited("same-key", "m", "p", None, True))
+        return mod.call_openai_rate_limited("same-key", "m", "p", None, True)
 
-    t0 = time.perf_counter()
-    t1 = threading.Thread(target=worker)
-    t2 = threading.Thread(target=worker)
-    t1.start(); t2.start()
-    t1.join(); t2.join()
-    elapsed = time.perf_counter() - t0
+    f1 = tpool.submit(worker)
+    assert entered[0].wait(2.0)
+    f2 = tpool.submit(worker)
+    blocked = entered[1].wait(0.05) is False
+    release.set()
+    results = [f1.result(), f2.result()]
 
-    print(f"[INFO] concurrency_limits_block -> elapsed={elapsed:.3f}s, calls={ok.calls}, results={results}")
+    log.debug("concurrency_limits_block -> second_blocked=%s, calls=%s, results=%s", blocked, ok.calls, results)
 
-    assert elapsed >= 0.65
+    assert blocked
+    assert entered[1].is_set()
     assert len(results) == 2
 
 
@@ -205,9 +226,9 @@ def test_env_fallbacks_when_config_missing(monkeypatch, reload_ai_gateway):
     }
     mod = reload_ai_gateway(with_config=False, env_overrides=env)
 
-    print(f"[INFO] env_fallbacks_when_config_missing -> "
-          f"RPM={mod.OPENAI_RPM_PER_KEY}, FAIL_FAST={mod.OPENAI_RPM_FAIL_FAST}, "
-          f"CONC={mod.OPENAI_MAX_CONCURRENCY_PER_KEY}, REDIS={mod.OPENAI_REDIS_URL}")
+    log.debug("env_fallbacks_when_config_missing -> RPM=%s, FAIL_FAST=%s, CONC=%s, REDIS=%s",
+              mod.OPENAI_RPM_PER_KEY, mod.OPENAI_RPM_FAIL_FAST,
+              mod.OPENAI_MAX_CONCURRENCY_PER_KEY, mod.OPENAI_REDIS_URL)
 
     assert mod.OPENAI_RPM_PER_KEY == 999
 
@@ -218,102 +239,90 @@ def test_retry_after_header_rounding(monkeypatch, reload_ai_gateway, inject_fake
         "OPENAI_MAX_CONCURRENCY_PER_KEY": 0,
         "OPENAI_RPM_PER_KEY": 480,
     })
-    fake = make_fake_limiter(mod, mode="bucketfull", reset_in=2.0)
+    fake = make_limiter(mod, always_fail=True, reset_in=2.0)
     monkeypatch.setattr(mod, "_limiter", fake, raising=True)
 
     inject_fake_openai_client(lambda *a, **k: {"status": "ok"})
     with pytest.raises(mod.OpenAIRateLimitError) as ei:
         mod.call_openai_rate_limited("k", "m", "p", None, False)
 
-    print(f"[INFO] retry_after_header_rounding -> Retry-After={ei.value.headers.get('Retry-After')}")
+    log.debug("retry_after_header_rounding -> Retry-After=%s", ei.value.headers.get("Retry-After"))
 
     assert ei.value.headers.get("Retry-After") == "2"
 
 @pytest.mark.parametrize(
-    "cap,N,D",
+    "cap,N",
     [
-        (5,  20, 0.15),  # 4 batches × 0.15s ≈ 0.60s
-        (10, 25, 0.20),  # 3 batches × 0.20s ≈ 0.60s
-        (20, 50, 0.10),  # 3 batches × 0.10s ≈ 0.30s
+        (5,  20),  # 4 full rendezvous
+        (10, 25),  # 2 full rendezvous + a tail of 5
+        (20, 50),  # 2 full rendezvous + a tail of 10
     ],
 )
-def test_concurrency_cap_parametrized(monkeypatch, reload_ai_gateway, inject_fake_openai_client, cap, N, D):
+def test_concurrency_cap_parametrized(monkeypatch, configure_gateway, inject_fake_openai_client, tpool, cap, N):
     """
     Verify per-key in-flight concurrency cap for multiple configurations.
     - cap: semaphore cap (OPENAI_MAX_CONCURRENCY_PER_KEY)
     - N:   total concurrent calls
-    - D:   per-call sleep inside client (seconds)
+
+    Calls meet at a Barrier(cap) inside the client, so each group of `cap`
+    is in flight together (the cap is reachable) while the semaphore keeps
+    anyone else out (it is never exceeded). The tail beyond the last full
+    group returns straight away. No sleeps, no timing assertions.
     """
+    import threading
     # Realistic RPM config, focus on semaphore behavior.
-    mod = reload_ai_gateway(with_config=True, config_values={
-        "OPENAI_MAX_CONCURRENCY_PER_KEY": cap,
-        "OPENAI_RPM_PER_KEY": 480,       # realistic vendor-aligned RPM
-        "OPENAI_RPM_FAIL_FAST": False,
-    })
+    mod = configure_gateway(
+        OPENAI_MAX_CONCURRENCY_PER_KEY=cap,
+        OPENAI_RPM_PER_KEY=480,          # realistic vendor-aligned RPM
+        OPENAI_RPM_FAIL_FAST=False,
+    )
 
     # Limiter stub: never blocks (so only semaphore controls concurrency)
-    class _OKLimiter:
-        def __init__(self): self.calls = 0
-        def try_acquire(self, key, tokens=1):
-            self.calls += 1
-            return True
-        @contextmanager
-        def ratelimit(self, key, delay=True):
-            self.calls += 1
-            yield
-
-    ok = _OKLimiter()
+    ok = make_limiter(mod)
     monkeypatch.setattr(mod, "_limiter", ok, raising=True)
 
     # Track concurrent in-flight calls
     active = 0
     max_active = 0
+    entries = 0
     lock = threading.Lock()
+    barrier = threading.Barrier(cap, timeout=2.0)
+    in_groups = (N // cap) * cap  # entries that belong to a full group
 
     KEY = "same-key"
 
-    def slow_call(*a, **k):
-        nonlocal active, max_active
+    def rendezvous_call(*a, **k):
+        nonlocal active, max_active, entries
         with lock:
             active += 1
-            if active > max_active:
-                max_active = active
+            max_active = max(max_active, active)
+            i = entries
+            entries += 1
         try:
-            time.sleep(D)
+            if i < in_groups:
+                barrier.wait()
             return {"status": "ok"}
         finally:
             with lock:
                 active -= 1
 
-    inject_fake_openai_client(slow_call)
-
-    results = []
-    def worker():
-        results.append(mod.call_openai_rate_limited(KEY, "m", "p", None, True))
-
-    t0 = time.perf_counter()
-    threads = [threading.Thread(target=worker) for _ in range(N)]
-    for t in threads: t.start()
-    for t in threads: t.join()
-    elapsed = time.perf_counter() - t0
+    inject_fake_openai_client(rendezvous_call)
 
-    expected_batches = math.ceil(N / cap)
-    expected_min = expected_batches * D
+    results = list(tpool.map(lambda _: mod.call_openai_rate_limited(KEY, "m", "p", None, True), range(N)))
 
-    # Assertions (with a small jitter allowance)
     assert len(results) == N and all(r["status"] == "ok" for r in results)
-    assert elapsed >= expected_min - 0.03, f"Elapsed {elapsed:.3f}s < expected_min {expected_min:.3f}s"
-    assert cap - 1 <= max_active <= cap, f"max_active={max_active}, expected close to cap={cap}"
-
-    # Helpful output (visible with -s / -vv -s)
-    print(
-        f"[INFO] cap={cap} N={N} D={D:.2f} -> "
-        f"elapsed={elapsed:.3f}s, batches={expected_batches}, "
-        f"max_active={max_active}, limiter_calls={ok.calls}"
-    )
+    assert max_active == cap, f"max_active={max_active}, expected cap={cap}"
+
+    # Helpful output (visible with --log-cli-level=DEBUG)
+    log.debug("cap=%s N=%s -> groups=%s, max_active=%s, limiter_calls=%s",
+              cap, N, N // cap, max_active, ok.calls)
 
-@pytest.mark.parametrize("rpm, reset_in", [(10, 1.2), (50, 0.5), (100, 2.0)])
-def test_rpm_fail_fast_sequential_gateway_level(monkeypatch, reload_ai_gateway, inject_fake_openai_client, rpm, reset_in):
+@pytest.mark.parametrize(
+    "rpm, reset_in, expected_retry_after",
+    [pytest.param(rpm, r, _retry_after(r)) for rpm, r in ((10, 1.2), (50, 0.5), (100, 2.0))],
+)
+def test_rpm_fail_fast_sequential_gateway_level(monkeypatch, configure_gateway, inject_fake_openai_client,
+                                                rpm, reset_in, expected_retry_after):
     """
     Deterministic gateway-level test:
       - OPENAI_RPM_PER_KEY = rpm, FAIL_FAST=True
@@ -321,38 +330,16 @@ def test_rpm_fail_fast_sequential_gateway_level(monkeypatch, reload_ai_gateway,
         and the (rpm+1)-th raises BucketFullException with meta_info.reset_in.
       - Verifies your HTTP 429 + Retry-After mapping precisely.
     """
-    mod = reload_ai_gateway(with_config=True, config_values={
-        "OPENAI_RPM_PER_KEY": rpm,
-        "OPENAI_RPM_FAIL_FAST": True,
-        "OPENAI_MAX_CONCURRENCY_PER_KEY": 0,
-    })
+    mod = configure_gateway(
+        OPENAI_RPM_PER_KEY=rpm,
+        OPENAI_RPM_FAIL_FAST=True,
+        OPENAI_MAX_CONCURRENCY_PER_KEY=0,
+    )
 
-    # Build a BucketFullException with meta_info.reset_in like the real lib
-    def _bucket_full_exc():
-        cls = mod.BucketFullException
-        exc = cls.__new__(cls)
-        Exception.__init__(exc, "bucket full")
-        setattr(exc, "meta_info", {"reset_in": float(reset_in), "rate": f"{rpm}/minute"})
-        return exc
-
-    # Wrap ONLY the ratelimit context manager, keep everything else intact
-    real = mod._limiter
-    count = {"n": 0}
-
-    class _CountedLimiter:
-        @contextmanager
-        def ratelimit(self, key, delay=True):
-            count["n"] += 1
-            if count["n"] <= rpm:
-                # allow the first `rpm` calls to pass
-                with real.ratelimit(key, delay=delay):
-                    yield
-            else:
-                # on (rpm+1)-th call, simulate bucket full immediately
-                raise _bucket_full_exc()
-
-    # Force gateway to use the wrapped ratelimit path (ignore try_acquire if present)
-    monkeypatch.setattr(mod, "_limiter", _CountedLimiter(), raising=True)
+    # Wrap ONLY the ratelimit context manager: the first `rpm` calls go through
+    # the real limiter, the (rpm+1)-th simulates bucket full immediately
+    fake = make_limiter(mod, passes_until=rpm, wrap_real=mod._limiter, reset_in=reset_in)
+    monkeypatch.setattr(mod, "_limiter", fake, raising=True)
 
     # Fast client
     inject_fake_openai_client(lambda *a, **k: {"status": "ok"})
@@ -370,8 +357,149 @@ def test_rpm_fail_fast_sequential_gateway_level(monkeypatch, reload_ai_gateway,
 
     err = ei.value
     assert err.status_code == 429
-    expected_retry_after = str(int(math.ceil(reset_in)))
     assert err.headers.get("Retry-After") == expected_retry_after
     assert f"{rpm}/minute" in err.detail
 
-    print(f"[INFO] sequential gateway-level rpm={rpm} -> passed={rpm}, then 429 with Retry-After={expected_retry_after}")
+    log.debug("sequential gateway-level rpm=%s -> passed=%s, then 429 with Retry-After=%s",
+              rpm, rpm, expected_retry_after)
+
+# --------------------------- Async gateway ------------------------------------
+
+def test_async_calls_openai_api_under_limits(monkeypatch, reload_ai_gateway, inject_fake_openai_client):
+    import asyncio
+    mod = reload_ai_gateway(with_config=True, config_values={
+        "OPENAI_MAX_CONCURRENCY_PER_KEY": 2,
+        "OPENAI_RPM_PER_KEY": 123,
+        "OPENAI_RPM_FAIL_FAST": False,
+    })
+    fake = make_limiter(mod)
+    monkeypatch.setattr(mod, "_limiter", fake, raising=True)
+
+    inject_fake_openai_client(lambda *a, **k: {"status": "ok", "args": a})
+    out = asyncio.run(mod.call_openai_rate_limited_async("k-async", "gpt-x", "hello", 42, True))
+
+    log.debug("async_under_limits -> limiter_calls=%s, last_key=%s", fake.calls, fake.last_key)
+
+    assert out["status"] == "ok"
+    assert out["args"] == ("k-async", "gpt-x", "hello", 42, True)
+    assert fake.last_key == "k-async"
+
+
+def test_async_fail_fast_raises_429(monkeypatch, reload_ai_gateway, inject_fake_openai_client):
+    import asyncio
+    mod = reload_ai_gateway(with_config=True, config_values={
+        "OPENAI_RPM_FAIL_FAST": True,
+        "OPENAI_MAX_CONCURRENCY_PER_KEY": 1,
+        "OPENAI_RPM_PER_KEY": 480,
+    })
+    fake = make_limiter(mod, always_fail=True, reset_in=1.4)
+    monkeypatch.setattr(mod, "_limiter", fake, raising=True)
+
+    inject_fake_openai_client(lambda *a, **k: (_ for _ in ()).throw(AssertionError("client must not be called")))
+    with pytest.raises(mod.OpenAIRateLimitError) as ei:
+        asyncio.run(mod.call_openai_rate_limited_async("k", "m", "p", None, False))
+
+    assert ei.value.status_code == 429
+    assert ei.value.headers.get("Retry-After") == "2"
+
+
+def test_async_blocking_mode_waits_for_token(monkeypatch, reload_ai_gateway, inject_fake_openai_client):
+    import asyncio
+    import time
+    mod = reload_ai_gateway(with_config=True, config_values={
+        "OPENAI_RPM_FAIL_FAST": False,
+        "OPENAI_MAX_CONCURRENCY_PER_KEY": 0,
+        "OPENAI_RPM_PER_KEY": 480,
+    })
+    fake = make_limiter(mod, always_fail=True, reset_in=0.1)
+    real_try = fake.try_acquire
+
+    def try_then_ok(self, key, tokens=1):
+        if self.calls >= 2:  # third attempt gets a token
+            self.always_fail = False
+        return real_try(key, tokens)
+    # slotted instance: patch the class (monkeypatch restores it)
+    monkeypatch.setattr(_FakeLimiter, "try_acquire", try_then_ok)
+    monkeypatch.setattr(mod, "_limiter", fake, raising=True)
+
+    inject_fake_openai_client(lambda *a, **k: {"status": "ok"})
+    t0 = time.perf_counter()
+    out = asyncio.run(mod.call_openai_rate_limited_async("k", "m", "p", None, True))
+    elapsed = time.perf_counter() - t0
+
+    log.debug("async_blocking_mode -> elapsed=%.3fs, limiter_calls=%s", elapsed, fake.calls)
+
+    assert out["status"] == "ok"
+    assert fake.calls == 3
+    assert elapsed >= 0.19
+
+
+def test_async_concurrency_cap(monkeypatch, reload_ai_gateway, inject_fake_openai_client):
+    import asyncio
+    import math
+    import threading
+    import time
+    cap, N, D = 3, 9, 0.1
+    mod = reload_ai_gateway(with_config=True, config_values={
+        "OPENAI_MAX_CONCURRENCY_PER_KEY": cap,
+        "OPENAI_RPM_PER_KEY": 480,
+        "OPENAI_RPM_FAIL_FAST": False,
+    })
+    monkeypatch.setattr(mod, "_limiter", make_limiter(mod), raising=True)
+
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def slow_call(*a, **k):
+        nonlocal active, max_active
+        with lock:
+            active += 1
+            max_active = max(max_active, active)
+        try:
+            time.sleep(D)
+            return {"status": "ok"}
+        finally:
+            with lock:
+                active -= 1
+    inject_fake_openai_client(slow_call)
+
+    async def run_all():
+        return await asyncio.gather(*(
+            mod.call_openai_rate_limited_async("same-key", "m", "p", None, True) for _ in range(N)
+        ))
+
+    t0 = time.perf_counter()
+    results = asyncio.run(run_all())
+    elapsed = time.perf_counter() - t0
+
+    log.debug("async cap=%s N=%s D=%.2f -> elapsed=%.3fs, max_active=%s", cap, N, D, elapsed, max_active)
+
+    assert len(results) == N and all(r["status"] == "ok" for r in results)
+    assert max_active == cap
+    assert elapsed >= math.ceil(N / cap) * D - 0.03
+
+# --------------------------- Striped limiter ----------------------------------
+
+def test_limiter_stripes_route_keys_consistently(reload_ai_gateway):
+    mod = reload_ai_gateway(with_config=True, config_values={
+        "OPENAI_MAX_CONCURRENCY_PER_KEY": 0,
+        "OPENAI_RPM_PER_KEY": 123,
+        "OPENAI_RPM_FAIL_FAST": False,
+    })
+    lim = mod._limiter
+    assert len(lim._stripes) == mod._LIMITER_STRIPES
+    assert len({id(s) for s in lim._stripes}) == mod._LIMITER_STRIPES
+
+    # same key -> same stripe, every time
+    assert lim.stripe_for("k-1") is lim.stripe_for("k-1")
+
+    # many distinct keys spread over more than one stripe
+    used = {id(lim.stripe_for(f"k-{i}")) for i in range(200)}
+    assert len(used) > 1
+
+    # both entry points still work through the stripe
+    with lim.ratelimit("k-1", delay=True):
+        pass
+    lim.try_acquire("k-1")
+    log.debug("limiter stripes -> %s/%s used by 200 keys", len(used), mod._LIMITER_STRIPES)
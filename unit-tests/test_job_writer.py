@@ -0,0 +1,48 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.utils import job_writer
+
+# ------------------------------- Helpers --------------------------------------
+
+def _fake_app():
+    return SimpleNamespace(state=SimpleNamespace(jobs_pending_insert={}))
+
+def _job(app, job_id, events):
+    app.state.jobs_pending_insert[job_id] = "2026-01-01 00:00:00"
+    return (
+        job_id, "user", "key",
+        lambda: events.append(("started", job_id)),
+        lambda: events.append(("abandoned", job_id)),
+    )
+
+# ------------------------------- Tests ----------------------------------------
+
+def test_failed_insert_does_not_schedule_job(monkeypatch):
+    monkeypatch.setattr(job_writer, "create_jobs", lambda rows: False)
+    monkeypatch.setattr(job_writer, "create_job", lambda *row: False)
+    app, events = _fake_app(), []
+
+    asyncio.run(job_writer._flush(app, [_job(app, "j1", events)]))
+
+    assert events == [("abandoned", "j1")]
+    assert app.state.jobs_pending_insert == {}
+
+
+def test_failed_batch_falls_back_to_row_inserts(monkeypatch):
+    inserted = []
+    def create_job(job_id, user_id, api_key):
+        if job_id == "bad":
+            return False
+        inserted.append(job_id)
+        return True
+    monkeypatch.setattr(job_writer, "create_jobs", lambda rows: False)
+    monkeypatch.setattr(job_writer, "create_job", create_job)
+    app, events = _fake_app(), []
+
+    batch = [_job(app, "j1", events), _job(app, "bad", events), _job(app, "j2", events)]
+    asyncio.run(job_writer._flush(app, batch))
+
+    assert inserted == ["j1", "j2"]
+    assert events == [("started", "j1"), ("abandoned", "bad"), ("started", "j2")]
+    assert app.state.jobs_pending_insert == {}